@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from scipy.integrate import odeint
+from dashapp.ODE.sweep import SweepExecutor
 
 
 def goodwill(par, t , v, k, n):
@@ -24,6 +25,28 @@ def goodwill(par, t , v, k, n):
     return [dx, dy, dz]
 
 
+def goodwill_jacobian(par, t , v, k, n):
+    """analytic Jacobian of the Goodwill-Oscillator (Dfun for odeint), J[i, j] = d(f_i)/d(par_j)"""
+
+    x,y,z = par
+    v1, v2, v3, v4, v5, v6 = v
+    k1,k2,k4,k6 = k
+
+    return np.array([
+        [- v2 * k2 / (k2 + x)**2, 0, - v1 * n * k1**n * z**(n - 1) / (k1**n + z**n)**2],
+        [v3, - v4 * k4 / (k4 + y)**2, 0],
+        [0, v5, - v6 * k6 / (k6 + z)**2]
+    ])
+
+
+def goodwill_extrema(v, par, t, k, n):
+    """solving one parameter set and only returning max and min of the mean normalized x (worker for the process pool)"""
+    sol = odeint(goodwill, par, t, args = (v, k, n), Dfun = goodwill_jacobian)
+    x = sol[-5000:, 0] / np.mean(sol[-5000:, 0])
+
+    return max(x), min(x)
+
+
 class Goodwill_models:
 
     def __init__(self, par, v, k, n, t):
@@ -51,7 +74,7 @@ class Goodwill_models:
         k = self.k
         n = self.n
 
-        return odeint(goodwill, par, t, args = (v, k, n))
+        return odeint(goodwill, par, t, args = (v, k, n), Dfun = goodwill_jacobian)
     
     
     def norm_to_mean(self):
@@ -109,7 +132,7 @@ class Goodwill_models:
         return None
     
 
-    def bifurcation_values(self, v_start : int, v_end : int, v_index : int, par_index : int):
+    def bifurcation_values(self, v_start : int, v_end : int, v_index : int, par_index : int, max_workers : int = None, chunksize : int = 4):
         """getting max and min of our solution
 
         Args:
@@ -117,6 +140,8 @@ class Goodwill_models:
             v_end (int): End
             v_index (int) : index for which v will be look at
             par_index (int) : index for which parameter
+            max_workers (int) : numbers of processes for the sweep (SweepExecutor), None takes all cores, 1 runs it serial
+            chunksize (int) : v values per task of the process pool
         """
 
         t = self.t
@@ -132,20 +157,17 @@ class Goodwill_models:
             v[v_index] = v_look[i]
             v_new.append(v.copy())  #.copy() prevent overrighting the list with the new variable
 
-        solve = [odeint(goodwill, par, t, args = (o, k, n)) for o in v_new]
-        
-        normalize = lambda x: [x[-5000:, j] / np.mean(x[-5000:, j]) for j in range(3)]
-
-        norm = [normalize(i) for i in solve]
+        # only max and min are sent back from the workers, not the whole solutions
+        extrema = SweepExecutor(max_workers, chunksize).map(goodwill_extrema, v_new, par = par, t = t, k = k, n = n)
 
-        maxi = [max(i[0]) for i in norm]
-        mini = [min(i[0]) for i in norm]
+        maxi = [i[0] for i in extrema]
+        mini = [i[1] for i in extrema]
         
         return maxi, mini
 
     
-    def bifurcation_plot(self, v_start : int, v_end : int, v_index : int, par_index : int):
-        maxi, mini = self.bifurcation_values(v_start, v_end,v_index, par_index)
+    def bifurcation_plot(self, v_start : int, v_end : int, v_index : int, par_index : int, max_workers : int = None):
+        maxi, mini = self.bifurcation_values(v_start, v_end,v_index, par_index, max_workers)
         v_look = np.arange(v_start, v_end, 0.01)
         v = ["v$_1$", "v$_2$", "v$_3$", "v$_4$", "v$_5$", "v$_6$", "v$_7$"]
         plt.plot(v_look,maxi,'g')
@@ -181,25 +203,27 @@ class Goodwill_models:
 
 
 
-par = [0,0,0]
-v = [0.7, 0.45, 0.7, 0.35, 0.7, 0.35]
-k = [1,1,1,1]
-n = 7
-t = np.arange(0,500, 0.01) # dont set time at 0. there will be some transient effects on the oscillation
+if __name__ == "__main__":   # the worker processes of the sweeps import this file again, they should not run the examples
+
+    par = [0,0,0]
+    v = [0.7, 0.45, 0.7, 0.35, 0.7, 0.35]
+    k = [1,1,1,1]
+    n = 7
+    t = np.arange(0,500, 0.01) # dont set time at 0. there will be some transient effects on the oscillation
 
-good = Goodwill_models(par, v, k, n, t)
+    good = Goodwill_models(par, v, k, n, t)
 
 
-# [examples, timeseries and phasespace]_______________________________________________________________________________________________________________________
+    # [examples, timeseries and phasespace]_______________________________________________________________________________________________________________________
 
 
-solv = good.goodplot_timeseries()
-print(solv, good.phasespace())
+    solv = good.goodplot_timeseries()
+    print(solv, good.phasespace())
 
 
-# [examples, bifurcation]_______________________________________________________________________________________________________________________
+    # [examples, bifurcation]_______________________________________________________________________________________________________________________
 
-print(good.bifurcation_plot(0.45,1.5, 1, 0))
+    print(good.bifurcation_plot(0.45,1.5, 1, 0))
 
 # there is some damping issues and some min and max issues..
 
@@ -1,5 +1,6 @@
 from ODE import Goodwin
 from ODE import Clockinteractions
+from ODE.store import ResultStore
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -8,6 +9,8 @@ Recreating Marta del Olmos paper.
 """
 
 
+store = ResultStore()   # solutions stay on disk (~/.cache/ode-training), so a second run of a figure does not integrate again
+
 # [Goodwin]____________________________________________________________________________________________________________________________
 
 par = [0, 0, 0]
@@ -19,7 +22,7 @@ v = [0.7, 0.45, 0.7, 0.35, 0.7, 0.35]
 k = [1,1,1,1]
 n = 7
 
-good = Goodwin(par, t, v, k, n, t_step, t_last)
+good = Goodwin(par, t, v, k, n, t_step, t_last, store = store)
 
 
 # [Figure 3]: Limit cycle oscillations, plotted as time series and in phase space
@@ -43,10 +46,10 @@ good = Goodwin(par, t, v, k, n, t_step, t_last)
 
 n_no_loop = 4
 
-# without_loop = Goodwin(par, np.arange(0, 500, t_step), v, k, n_no_loop, t_step, t_last = 300).limitcircle_timeseries()
+# without_loop = Goodwin(par, np.arange(0, 500, t_step), v, k, n_no_loop, t_step, t_last = 300, store = store).limitcircle_timeseries()
 
 
-# t_positive = Goodwin(par, np.arange(0, 5000, t_step), v, k, n_no_loop, t_step, t_last = 120).limitcircle_timeseries_positive_feedback(c = 1)
+# t_positive = Goodwin(par, np.arange(0, 5000, t_step), v, k, n_no_loop, t_step, t_last = 120, store = store).limitcircle_timeseries_positive_feedback(c = 1)
 
 
 
@@ -42,3 +42,4 @@ The second class is about the interaction of the clock with the enviroment.
 from .goodwin import Goodwin
 from .clock_interaction import Clockinteractions
 from .duffing_poincare import Duffing
+from .continuation import Continuation
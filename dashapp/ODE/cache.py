@@ -0,0 +1,165 @@
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+
+# [Key]__________________________________________________________________________________________________________________________________________
+
+def hash_key(*parts):
+    """
+    Building an immutable key out of the inputs of a solver run (initial values, timespan, v, k, n, sweep spec...).
+    Arrays are hashed by dtype, shape and their raw bytes, so two equal timespans give the same key without keeping the array alive.
+
+    Args:
+        *parts: numbers, strings, lists, tuples or arrays
+
+    Returns:
+        str: sha1 hexdigest of all parts
+    """
+    digest = hashlib.sha1()
+
+    for part in parts:
+        if isinstance(part, (list, tuple, np.ndarray)):
+            array = np.ascontiguousarray(part, dtype = float)
+            digest.update(str(array.shape).encode())
+            digest.update(array)   # buffer protocol, no copy of big timespans
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"|")
+
+    return digest.hexdigest()
+
+
+def nbytes(value):
+    """size of a cached solution in bytes (arrays or lists of arrays)"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes(i) for i in value)
+
+    return 0
+
+
+def freeze(value):
+    """making the cached arrays read only, so nobody can change a solution that is shared by other methods"""
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+
+    elif isinstance(value, (list, tuple)):
+        for i in value:
+            freeze(i)
+
+    return value
+
+
+# [Cache]________________________________________________________________________________________________________________________________________
+
+class SolutionCache:
+    """
+    LRU memory for solver results. Every distinct integration should only run once per process.
+
+    The entries are evicted in least recently used order as soon as the cache holds more than max_bytes
+    or more than max_entries solutions. A single result that is bigger than max_bytes is not stored at all.
+    The cache is shared by the request threads of the Dash app, so every access to the entries goes through a lock,
+    while the solving itself runs outside of it (only one thread solves a key, the others wait for its result).
+    """
+
+    def __init__(self, max_bytes : int = 2 * 1024**3, max_entries : int = 128):
+        """
+        Args:
+            max_bytes (int): size cap of all cached arrays in bytes
+            max_entries (int): numbers of cached solutions
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.solving = {}   # key -> lock of the thread that is solving it right now
+
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+    def get(self, key, default = None):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+            return entry[0]
+
+
+    def put(self, key, value):
+        size = nbytes(value)
+
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+
+            if size > self.max_bytes:
+                return value
+
+            self.entries[key] = (freeze(value), size)
+            self.size += size
+
+            while self.size > self.max_bytes or len(self.entries) > self.max_entries:
+                self.size -= self.entries.popitem(last = False)[1][1]
+
+        return value
+
+
+    def get_or_solve(self, key, solve):
+        """
+        Returning the cached result of key. Only if it is missing, solve() gets called and its result is stored.
+
+        Args:
+            key (str): key from hash_key
+            solve (callable): function without arguments that does the integration
+
+        Returns:
+            the (read only) result
+        """
+        value = self.get(key)
+
+        if value is not None:
+            return value
+
+        with self.lock:
+            solving = self.solving.setdefault(key, threading.Lock())
+
+        try:
+            with solving:   # a second thread with the same miss waits here instead of solving it again
+                with self.lock:
+                    entry = self.entries.get(key)
+
+                return entry[0] if entry is not None else self.put(key, solve())
+        finally:
+            with self.lock:
+                if self.solving.get(key) is solving:
+                    del self.solving[key]
+
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+solution_cache = SolutionCache()
@@ -1,7 +1,9 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.integrate import odeint
+from scipy.integrate import odeint, solve_ivp
+from scipy.sparse import csc_matrix
+from .integrators import iter_solve, output_grid
 from scipy.signal import argrelmax
 from scipy.signal import find_peaks
  
@@ -50,25 +52,243 @@ def coupled_oscillator(par, t, A, period, lam, K, n):
  
     return np.concatenate((dx,dy))
 
+def coupled_oscillator_vectorized(par, t, A, period, lam, K, n):
+    """
+    coupled_oscillator for a whole ensemble of networks at once (for the integrators in integrators.py).
+    Every member is one network of n oscillators with its own meanfield.
+
+    Args:
+        par (array): (M, 2n) x and y values of every network
+        t (float or array): time
+        A (int): Oscillation amplitude
+        period (array): (n,) periods shared by all networks or (M, n) periods of every network
+        lam (int): amplitude relaxtation rate
+        K (int): denotes strength of the coupling between meanfield and single oscillatory units
+        n (int): numbers of oscillators in every network
+
+    Returns:
+        array: (M, 2n) dx and dy of every network
+    """
+    x = par[:, 0:n]
+    y = par[:, n:2 * n]
+
+    r = np.sqrt(x**2 + y**2)
+
+    dx = lam * x * (A - r) - (2 * np.pi * y / period) + K * meanfield(n, x.T)[:, None]
+    dy = lam * y * (A - r) + (2 * np.pi * x / period)
+
+    return np.concatenate((dx, dy), axis = 1)
+
+def coupled_oscillator_jacobian(par, t, A, period, lam, K, n):
+    """
+    Analytic Jacobian of the coupled oscillators (Dfun for odeint). With r_i = sqrt(x_i^2 + y_i^2):
+
+        d(dx_i)/dx_i = lam * (A - r_i) - lam * x_i^2/r_i        d(dx_i)/dy_i = - lam * x_i * y_i/r_i - 2π/T_i
+
+        d(dy_i)/dx_i = - lam * x_i * y_i/r_i + 2π/T_i           d(dy_i)/dy_i = lam * (A - r_i) - lam * y_i^2/r_i
+
+    Every dx_i gets K/n from the meanfield for each x_j.
+
+    Args:
+        par (list): x and y values as list
+        t (array or list): time
+        A (int): Oscillation amplitude
+        period (int): period
+        K (int): denotes strength of the coupling between meanfield and single oscillatory units
+        n (int): numbers of values of x in the area
+        lam (int): amplitude relaxtation rate
+
+    Returns:
+        array: (2n, 2n) Jacobian, J[i, j] = d(f_i)/d(par_j)
+    """
+    x = par[0:n:1]
+    y = par [-n::1]
+
+    r = np.sqrt(x**2 + y**2)
+    r_safe = np.where(r > 0, r, 1)   # x^2/r, y^2/r and x*y/r all go to 0 for r -> 0
+
+    dxdx = lam * (A - r) - lam * x**2 / r_safe
+    dxdy = - lam * x * y / r_safe - 2 * np.pi / period
+    dydx = - lam * x * y / r_safe + 2 * np.pi / period
+    dydy = lam * (A - r) - lam * y**2 / r_safe
+
+    jac = np.zeros((2 * n, 2 * n))
+    jac[:n, :n] = K / n      # meanfield coupling
+    i = np.arange(n)
+    jac[i, i] += dxdx
+    jac[i, i + n] = dxdy
+    jac[i + n, i] = dydx
+    jac[i + n, i + n] = dydy
+
+    return jac
+
+def coupled_oscillator_meanfield(t, par, A, period, lam, K, n):
+    """
+    coupled_oscillator with the meanfield M as an extra state variable (solve_ivp order -> t first).
+
+    The meanfield couples every x_i with every x_j, so the Jacobian of coupled_oscillator is
+    block diagonal (one 2x2 block for each oscillator) plus a dense rank-one part K/n. With M as its own variable
+
+        dM/dt = 1/N ∑ dx_i/dt
+
+    the dense part turns into one row and one column, and the Jacobian only has about 6N entries.
+    As long as M starts at the mean of x, it stays the mean of x.
+
+    Args:
+        t (float): time
+        par (array): x values, y values and M -> [x_1 ... x_n, y_1 ... y_n, M]
+        A (int): Oscillation amplitude
+        period (array): period of every oscillator
+        lam (int): amplitude relaxtation rate
+        K (int): denotes strength of the coupling between meanfield and single oscillatory units
+        n (int): numbers of oscillators
+
+    Returns:
+        array: dx, dy and dM
+    """
+    x = par[0:n]
+    y = par[n:2 * n]
+    M = par[-1]
+    period = np.ravel(period)
+
+    r = np.sqrt(x**2 + y**2)
+
+    dx = lam * x * (A - r) - (2 * np.pi * y / period) + K * M
+    dy = lam * y * (A - r) + (2 * np.pi * x / period)
+    dM = np.mean(dx)
+
+    return np.concatenate((dx, dy, [dM]))
+
+def coupled_oscillator_meanfield_jacobian(t, par, A, period, lam, K, n):
+    """
+    Sparse Jacobian of coupled_oscillator_meanfield. It is an arrow matrix: the 2x2 blocks of the single
+    oscillators, the column d(dx_i)/dM = K and the row d(dM)/d(x_i, y_i). LU factorizing it does not fill in,
+    so implicit solvers (BDF, Radau) need linear memory and time in the numbers of oscillators.
+
+    Returns:
+        csc_matrix: (2n + 1, 2n + 1) Jacobian
+    """
+    x = par[0:n]
+    y = par[n:2 * n]
+    period = np.ravel(period)
+
+    r = np.sqrt(x**2 + y**2)
+    r_safe = np.where(r > 0, r, 1)   # x^2/r, y^2/r and x*y/r all go to 0 for r -> 0
+
+    dxdx = lam * (A - r) - lam * x**2 / r_safe
+    dxdy = - lam * x * y / r_safe - 2 * np.pi / period
+    dydx = - lam * x * y / r_safe + 2 * np.pi / period
+    dydy = lam * (A - r) - lam * y**2 / r_safe
+
+    i = np.arange(n)
+    last = np.full(n, 2 * n)
+
+    rows = np.concatenate((i, i, i + n, i + n, i, last, last, [2 * n]))
+    cols = np.concatenate((i, i + n, i, i + n, last, i, i + n, [2 * n]))
+    data = np.concatenate((dxdx, dxdy, dydx, dydy, np.full(n, K), dxdx / n, dxdy / n, [K]))   # dM = mean(dx)
+
+    return csc_matrix((data, (rows, cols)), shape = (2 * n + 1, 2 * n + 1))
+
 # [Interactions]_________________________________________________________________________________________________________________________________
 class Clockinteractions:
 
-    def __init__(self, x, y , t, A, period, lam, n, K):
+    def __init__(self, x, y , t, A, period, lam, n, K, output = None, chunk : int = 10000, output_step : float = None, dtype = float):
+        """
+        Args:
+            x (list): x initial values of the n oscillators
+            y (list): y initial values of the n oscillators
+            t (array): timespan
+            A (float): amplitude
+            period (array): periods of the oscillators
+            lam (float): amplitude relaxation rate
+            n (int): numbers of oscillators
+            K (float): coupling strength to the meanfield
+            output (str): path of a .npy file. With it the solution is written straight into this memory mapped file while it is integrated,
+                          and bulksignals and plot_oscillator read it in blocks. So the memory stays flat, no matter how big n and t are
+            chunk (int): timepoints per block for the memory mapped output
+            output_step (float): only storing every output_step hours (a multiple of the steps of t). The solvers keep their own
+                                 internal steps, so the accuracy does not change. t becomes the thinned out grid
+            dtype: dtype of the stored solution (also of the memory mapped file), for example np.float32 or np.float16.
+                   The integration itself always runs in float64
+        """
         self.x = x
         self.y = y
-        self.t = t
+        self.t, self.stride = output_grid(t, output_step)
         self.A = A
         self.period = period
         self.lam = lam
         self.n = n
         self.K = K
+        self.output = output
+        self.chunk = chunk
+        self.dtype = np.dtype(dtype)
+        self.output_solution = None
 
     def sync_oscillator_solver(self):
-        """Solving the coupled Oscillator ODE
+        """Solving the coupled Oscillator ODE. With an output file the solution goes to disk (see memmap_solver).
 
         Returns:
             Array: [[x,y], [x,y], [x,y]...]
         """
+        if self.output is not None:
+            return self.memmap_solver()
+
+        x = self.x
+        y = self.y
+        t = self.t
+        A = self.A
+        period = self.period
+        lam = self.lam
+        n = self.n
+        K = self.K
+
+        par = np.hstack((x,y))
+
+        sol = odeint(coupled_oscillator, par, t, args = (A, period, lam, K, n), Dfun = coupled_oscillator_jacobian)
+        return sol.astype(self.dtype, copy = False)
+    
+    def sparse_oscillator_solver(self, method = "BDF", rtol = 1e-6, atol = 1e-8):
+        """Solving the coupled Oscillator ODE with an implicit solver for large networks (thousands of SCN cells).
+
+        The meanfield is integrated as an extra variable (see coupled_oscillator_meanfield), so the Jacobian is a sparse
+        arrow matrix instead of a dense (2n, 2n) matrix. Memory and time per step grow linear with n.
+
+        Args:
+            method (str): implicit solve_ivp method -> "BDF", "Radau" or "LSODA"
+            rtol (float): relative tolerance
+            atol (float): absolute tolerance
+
+        Returns:
+            Array: [[x,y], [x,y], [x,y]...] same as sync_oscillator_solver
+        """
+        x = self.x
+        y = self.y
+        t = self.t
+        A = self.A
+        period = self.period
+        lam = self.lam
+        n = self.n
+        K = self.K
+
+        par = np.hstack((x, y, np.mean(x)))
+
+        sol = solve_ivp(coupled_oscillator_meanfield, (t[0], t[-1]), par, method = method, t_eval = t, args = (A, period, lam, K, n),
+                        jac = coupled_oscillator_meanfield_jacobian, rtol = rtol, atol = atol)
+
+        return sol.y[:2 * n].T.astype(self.dtype, copy = False)
+    
+    def iter_solve(self, chunk : int = 10000, sparse : bool = False):
+        """Streaming version of the solvers. The solution is handed out in blocks of chunk timepoints
+        while the solver keeps running, so a 100 day simulation never has to be in memory at once.
+
+        Args:
+            chunk (int): timepoints per block
+            sparse (bool): True uses the implicit BDF solver with the sparse meanfield Jacobian (sparse_oscillator_solver),
+                           False uses LSODA like sync_oscillator_solver
+
+        Yields:
+            tuple: (t_block, sol_block) -> timepoints and the (len(t_block), 2n) solution [[x,y], [x,y], [x,y]...]
+        """
         x = self.x
         y = self.y
         t = self.t
@@ -78,13 +298,53 @@ class Clockinteractions:
         n = self.n
         K = self.K
 
+        if sparse:
+            par = np.hstack((x, y, np.mean(x)))
+            blocks = iter_solve(lambda time, p: coupled_oscillator_meanfield(time, p, A, period, lam, K, n), t, par, chunk, "BDF",
+                                jac = lambda time, p: coupled_oscillator_meanfield_jacobian(time, p, A, period, lam, K, n),
+                                rtol = 1e-6, atol = 1e-8)
+
+            for t_block, sol_block in blocks:
+                yield t_block, sol_block[:, :2 * n]   # without the meanfield column
+            return
+
         par = np.hstack((x,y))
 
-        sol = odeint(coupled_oscillator, par, t, args = (A, period, lam, K, n))
-        return sol
+        yield from iter_solve(lambda time, p: coupled_oscillator(p, time, A, period, lam, K, n), t, par, chunk,
+                              jac = lambda time, p: coupled_oscillator_jacobian(p, time, A, period, lam, K, n))
     
+    def memmap_solver(self, sparse : bool = False):
+        """Solving the coupled Oscillator ODE straight into the memory mapped file output. The blocks of iter_solve are written
+        as soon as they are integrated, so only one block of chunk timepoints is in memory at a time.
+        The file is only written once per instance, later calls open it again.
+
+        Args:
+            sparse (bool): True uses the implicit BDF solver with the sparse meanfield Jacobian (like sparse_oscillator_solver)
+
+        Returns:
+            memmap: read only (len(t), 2n) solution [[x,y], [x,y], [x,y]...]
+        """
+        if self.output_solution is not None:
+            return self.output_solution
+
+        sol = np.lib.format.open_memmap(self.output, mode = "w+", dtype = self.dtype, shape = (len(self.t), 2 * self.n))
+
+        start = 0
+        for t_block, sol_block in self.iter_solve(self.chunk, sparse):
+            sol[start : start + len(sol_block)] = sol_block
+            start += len(sol_block)
+
+        sol.flush()
+        del sol
+
+        self.output_solution = np.load(self.output, mmap_mode = "r")
+
+        return self.output_solution
+
+
     def bulksignals(self, value_index):
         """
+        The solution is read in blocks of chunk timepoints, so a memory mapped solution never gets loaded as a whole.
 
         Args:
             value_index (int): Solutionposition -> x has the index 0 and y has the index 1
@@ -93,25 +353,39 @@ class Clockinteractions:
             Array: the mean value for through all the events.
         """
         sol = self.sync_oscillator_solver()
-        if value_index == 0:
-            mean_event = np.mean(sol.T[0:n:1], axis = 0)
-        
-        elif value_index == 1:
-            mean_event = np.mean(sol.T[-n::1], axis = 0)
+        n = self.n
+
+        columns = slice(0, n) if value_index == 0 else slice(n, 2 * n)
+        mean_event = np.empty(len(sol))
+
+        for start in range(0, len(sol), self.chunk):
+            mean_event[start : start + self.chunk] = np.mean(sol[start : start + self.chunk, columns], axis = 1)
 
         return mean_event
 
 
-    def plot_oscillator(self, value_index, t_last, t_step):
+    def plot_oscillator(self, value_index, t_last, t_step, columns : int = 100):
+        """
+        Plotting the last t_last hours of every oscillator (grey) and their mean (red).
+        The oscillators are read in blocks of columns, so a memory mapped solution never gets loaded as a whole.
+
+        Args:
+            value_index (int): Solutionposition -> x has the index 0 and y has the index 1
+            t_last (float): last part of the solution that will be plotted
+            t_step (float): steps of the (stored) timespan
+            columns (int): oscillators per block
+        """
         sol = self.sync_oscillator_solver()
         mean_event = self. bulksignals(value_index)
         n = self.n
 
-        keep = t_last/t_step
+        keep = int(t_last/t_step)
+        offset = 0 if value_index == 0 else n
 
-        for j in range(n):
-            plt.plot(np.arange(0, t_last, t_step), sol.T[j][-int(keep):] , "grey")
-        plt.plot(np.arange(0, t_last, t_step), mean_event, "red")
+        for j in range(0, n, columns):
+            block = np.array(sol[-keep:, offset + j : offset + min(j + columns, n)])
+            plt.plot(np.arange(0, t_last, t_step)[:keep], block, "grey")
+        plt.plot(np.arange(0, t_last, t_step)[:keep], mean_event[-keep:], "red")
         
         plt.ylim(-4,4)
         
@@ -0,0 +1,479 @@
+"""
+Numerical continuation of the Goodwin model.
+
+The brute-force bifurcation diagrams integrate thousands of hours for every grid point and only ever see the stable solutions.
+Here the branches are traced directly:
+
+    equilibria       f(x, p) = 0 with pseudo-arclength continuation, the eigenvalues of the Jacobian show stability and Hopf points
+
+    periodic orbits  shooting, phi(x0, T, p) - x0 = 0 with a phase condition. The monodromy matrix and d(phi)/dp come from the
+                     variational equations, its eigenvalues are the Floquet multipliers
+
+Every step only integrates one period, so a whole diagram takes seconds instead of minutes, and the unstable branches show up too.
+p can be any of v1 ... v6, k1, k2, k4, k6, n (and c for goodwin_with_positive_loop).
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy.integrate import odeint
+from scipy.optimize import fsolve
+from .goodwin import goodwin, goodwin_jacobian, goodwin_with_positive_loop, goodwin_with_positive_loop_jacobian, parameters
+
+
+# [Continuation]_________________________________________________________________________________________________________________________________
+
+class Continuation:
+    """
+    Pseudo-arclength continuation of the equilibria and limit cycles of goodwin (c = None) or goodwin_with_positive_loop.
+
+    A point on a branch is X = (x, y, z, p) for the equilibria and X = (x0, y0, z0, T, p) for the periodic orbits.
+    From every point the next one gets predicted along the secant of the branch and corrected with Newton,
+    with the extra condition that the correction is orthogonal to the secant. So the branch can also turn around (fold).
+    """
+
+    def __init__(self, v, k, n, parameter : str, c = None, p_min : float = 0, p_max : float = None,
+                 ds : float = 0.01, ds_min : float = 1e-6, ds_max : float = 0.5, tol : float = 1e-8):
+        """
+        Args:
+            v (ndarray or list): v1, v2, v3, v4, v5, v6
+            k (ndarray or list): K1, K2, K4, K6
+            n (int): Hill coefficient
+            parameter (str): parameter that gets continued ("v1" ... "v6", "k1", "k2", "k4", "k6", "n" or "c")
+            c (int): positive feedback loop on x, None uses the plain goodwin model
+            p_min (float): lower end of the parameter interval
+            p_max (float): upper end of the parameter interval, None takes three times the start value
+            ds (float): first arclength step
+            ds_min (float): the continuation stops if the step has to get smaller than this
+            ds_max (float): largest arclength step
+            tol (float): Newton tolerance
+        """
+        self.v = list(v)
+        self.k = list(k)
+        self.n = n
+        self.c = c
+        self.parameter = parameter
+        self.func = goodwin if c is None else goodwin_with_positive_loop
+        self.jac = goodwin_jacobian if c is None else goodwin_with_positive_loop_jacobian
+
+        group, index = parameters[parameter]
+        self.p0 = float(getattr(self, group)[index] if index is not None else getattr(self, group))
+        self.p_min = p_min
+        self.p_max = p_max if p_max is not None else 3 * self.p0
+        self.ds = ds
+        self.ds_min = ds_min
+        self.ds_max = ds_max
+        self.tol = tol
+        self.period_scale = 1       # T is continued as T / period_scale, so the period does not dominate the arclength
+
+
+    # [Model]____________________________________________________________________________________________________________________________________
+
+    def args(self, p):
+        """arguments of the model with the continued parameter set to p"""
+        values = {"v": list(self.v), "k": list(self.k), "n": self.n, "c": self.c}
+        group, index = parameters[self.parameter]
+
+        if index is None:
+            values[group] = p
+        else:
+            values[group][index] = p
+
+        if self.c is None:
+            return (values["v"], values["k"], values["n"])
+
+        return (values["v"], values["k"], values["n"], values["c"])
+
+
+    def f(self, x, p):
+        return np.array(self.func(x, 0, *self.args(p)), dtype = float)
+
+
+    def fx(self, x, p):
+        return np.asarray(self.jac(x, 0, *self.args(p)), dtype = float)
+
+
+    def fp(self, x, p):
+        """d(f)/dp with central differences"""
+        h = 1e-6 * max(1, abs(p))
+
+        return (self.f(x, p + h) - self.f(x, p - h)) / (2 * h)
+
+
+    def variational(self, x0, T, p, samples : int = 200):
+        """
+        Integrating the orbit together with its variational equations over one period
+
+            d(Phi)/dt = J Phi,  Phi(0) = I           -> monodromy matrix Phi(T)
+
+            d(s)/dt = J s + d(f)/dp,  s(0) = 0        -> s(T) = d(phi)/dp
+
+        Returns:
+            tuple: (phi(T), monodromy matrix, d(phi)/dp, (samples, 3) orbit)
+        """
+        args = self.args(p)
+        h = 1e-6 * max(1, abs(p))
+        up, down = self.args(p + h), self.args(p - h)
+
+        def fun(y, t):
+            x = y[:3]
+            J = self.jac(x, t, *args)
+            fp = (np.array(self.func(x, t, *up)) - np.array(self.func(x, t, *down))) / (2 * h)
+            return np.concatenate((self.func(x, t, *args), (J @ y[3:12].reshape(3, 3)).ravel(), J @ y[12:] + fp))
+
+        def jacobian(y, t):
+            # block diagonal approximation (without the second derivatives of f), it is only used by the implicit steps of LSODA
+            J = self.jac(y[:3], t, *args)
+            full = np.zeros((15, 15))
+            full[:3, :3] = J
+            full[3:12, 3:12] = np.kron(J, np.eye(3))
+            full[12:, 12:] = J
+            return full
+
+        y0 = np.concatenate((x0, np.eye(3).ravel(), np.zeros(3)))
+        sol = odeint(fun, y0, np.linspace(0, T, samples), Dfun = jacobian, rtol = 1e-9, atol = 1e-11, mxstep = 100000)
+
+        return sol[-1, :3], sol[-1, 3:12].reshape(3, 3), sol[-1, 12:], sol[:, :3]
+
+
+    # [Newton]___________________________________________________________________________________________________________________________________
+
+    def newton(self, residual, X, max_iter : int = 12):
+        """
+        Newton iteration for residual(X) -> (G, DG).
+
+        Returns:
+            tuple: (X, iterations) or None if it did not converge
+        """
+        for i in range(max_iter):
+            G, DG = residual(X)
+
+            try:
+                dX = np.linalg.solve(DG, - G)
+            except np.linalg.LinAlgError:
+                return None
+
+            X = X + dX
+
+            if not np.all(np.isfinite(X)) or np.any(X[:-1] < 0):    # concentrations (and the period) are never negative
+                return None
+
+            if np.linalg.norm(dX) < self.tol * (1 + np.linalg.norm(X)):
+                return X, i + 1
+
+        return None
+
+
+    def trace(self, X, tangent, correct, max_steps : int, stop = None):
+        """
+        Pseudo-arclength stepping along a branch.
+
+        Args:
+            X (array): first point of the branch, the parameter is the last entry
+            tangent (array): unit direction of the first step
+            correct (callable): correct(X_prediction, X_previous, tangent) -> (X, iterations) or None
+            max_steps (int): largest number of points
+            stop (callable): stop(X) -> True ends the branch
+
+        Returns:
+            list: points of the branch
+        """
+        points = [X]
+        ds = self.ds
+
+        while len(points) < max_steps:
+            corrected = correct(X + ds * tangent, X, tangent)
+
+            if corrected is None:
+                ds /= 2
+
+                if ds < self.ds_min:
+                    break
+                continue
+
+            X_new, iterations = corrected
+            secant = X_new - X
+            tangent = secant / np.linalg.norm(secant)
+            X = X_new
+            points.append(X)
+
+            if iterations <= 4:
+                ds = min(1.5 * ds, self.ds_max)
+
+            if not self.p_min <= X[-1] <= self.p_max or (stop is not None and stop(X)):
+                break
+
+        return points
+
+
+    # [Equilibria]_______________________________________________________________________________________________________________________________
+
+    def equilibrium(self, p = None, x0 = None):
+        """
+        Equilibrium at the parameter p. Without a guess x0 the model is integrated for a while and the mean of the end is taken,
+        which is close to the equilibrium even if it is unstable.
+
+        Returns:
+            array: x, y, z of the equilibrium
+        """
+        p = self.p0 if p is None else p
+
+        if x0 is None:
+            x0 = np.mean(odeint(self.func, [0.1, 0.1, 0.1], np.linspace(0, 1000, 2001), args = self.args(p), Dfun = self.jac)[-1000:], axis = 0)
+
+        return fsolve(self.f, x0, args = (p,), fprime = lambda x, p: self.fx(x, p), xtol = 1e-12)
+
+
+    def equilibrium_residual(self, X_prediction, tangent):
+        def residual(X):
+            x, p = X[:3], X[3]
+            G = np.append(self.f(x, p), tangent @ (X - X_prediction))
+            DG = np.vstack((np.column_stack((self.fx(x, p), self.fp(x, p))), tangent))
+            return G, DG
+
+        return residual
+
+
+    def hopf_test(self, X):
+        """largest real part of the complex eigenvalues, it changes its sign at a Hopf point"""
+        eigenvalues = np.linalg.eigvals(self.fx(X[:3], X[3]))
+        complex_pair = eigenvalues[np.abs(eigenvalues.imag) > 1e-9]
+
+        return np.max(complex_pair.real) if len(complex_pair) else - np.inf
+
+
+    def hopf_point(self, X_a, X_b):
+        """locating the Hopf point between two neighbouring points of the equilibrium branch with bisection"""
+        tangent = (X_b - X_a) / np.linalg.norm(X_b - X_a)
+        low, high = 0, np.linalg.norm(X_b - X_a)
+        sign = np.sign(self.hopf_test(X_a))
+        X = X_a
+
+        for i in range(60):
+            middle = (low + high) / 2
+            X_prediction = X_a + middle * tangent
+            corrected = self.newton(self.equilibrium_residual(X_prediction, tangent), X_prediction)
+
+            if corrected is None:
+                break
+
+            X = corrected[0]
+
+            if np.sign(self.hopf_test(X)) == sign:
+                low = middle
+            else:
+                high = middle
+
+            if high - low < 1e-12:
+                break
+
+        eigenvalues, eigenvectors = np.linalg.eig(self.fx(X[:3], X[3]))
+        i = np.argmax(np.where(eigenvalues.imag > 1e-9, - np.abs(eigenvalues.real), - np.inf))
+        omega = eigenvalues[i].imag
+
+        return {"parameter": X[3], "state": X[:3], "frequency": omega, "period": 2 * np.pi / omega, "eigenvector": eigenvectors[:, i]}
+
+
+    def equilibria(self, x0 = None, max_steps : int = 1000):
+        """
+        Continuation of the equilibria in both directions from the start value of the parameter.
+
+        Args:
+            x0 (list or array): guess of the equilibrium at the start value
+            max_steps (int): largest number of points per direction
+
+        Returns:
+            dict: "parameter" (N,), "state" (N, 3), "eigenvalues" (N, 3), "stable" (N,) and "hopf" -> list of the Hopf points
+                  (each a dict with "parameter", "state", "frequency", "period", "eigenvector")
+        """
+        X0 = np.append(self.equilibrium(self.p0, x0), self.p0)
+
+        def correct(X_prediction, X_previous, tangent):
+            return self.newton(self.equilibrium_residual(X_prediction, tangent), X_prediction)
+
+        # tangent of the branch: null space of [f_x, f_p]
+        tangent = np.linalg.svd(np.column_stack((self.fx(X0[:3], X0[3]), self.fp(X0[:3], X0[3]))))[2][-1]
+        tangent = tangent * np.sign(tangent[-1] or 1)
+
+        backward = self.trace(X0, - tangent, correct, max_steps)
+        forward = self.trace(X0, tangent, correct, max_steps)
+        points = np.array(backward[::-1] + forward[1:])
+
+        eigenvalues = np.array([np.linalg.eigvals(self.fx(X[:3], X[3])) for X in points])
+        test = np.array([self.hopf_test(X) for X in points])
+
+        hopf = [self.hopf_point(points[i], points[i + 1]) for i in range(len(points) - 1)
+                if np.isfinite(test[i]) and np.isfinite(test[i + 1]) and np.sign(test[i]) != np.sign(test[i + 1])]
+
+        return {
+            "parameter": points[:, 3],
+            "state": points[:, :3],
+            "eigenvalues": eigenvalues,
+            "stable": np.all(eigenvalues.real < 0, axis = 1),
+            "hopf": hopf,
+        }
+
+
+    # [Periodic orbits]__________________________________________________________________________________________________________________________
+
+    def periodic_residual(self, X_prediction, X_previous, tangent):
+        """
+        Shooting condition phi(x0, T, p) - x0 = 0, phase condition f(x_previous) . (x0 - x_previous) = 0
+        and the arclength condition.
+        """
+        anchor = self.f(X_previous[:3], X_previous[4])
+
+        def residual(X):
+            x0, T, p = X[:3], X[3] * self.period_scale, X[4]
+            end, monodromy, sensitivity = self.variational(x0, T, p, samples = 2)[:3]
+
+            G = np.concatenate((end - x0, [anchor @ (x0 - X_previous[:3]), tangent @ (X - X_prediction)]))
+            DG = np.zeros((5, 5))
+            DG[:3, :3] = monodromy - np.eye(3)
+            DG[:3, 3] = self.f(end, p) * self.period_scale
+            DG[:3, 4] = sensitivity
+            DG[3, :3] = anchor
+            DG[4] = tangent
+
+            return G, DG
+
+        return residual
+
+
+    def hopf_orbit(self, hopf, amplitude : float):
+        """
+        Small periodic orbit next to a Hopf point. The start point is shifted by amplitude along the real part of the critical
+        eigenvector, and the parameter is free while the amplitude and the phase are fixed.
+
+        Returns:
+            array: X = (x0, y0, z0, T / period_scale, p) or None
+        """
+        q = hopf["eigenvector"]
+        q = q / np.linalg.norm(q.real)
+        real, imag = q.real, q.imag - (q.imag @ q.real) * q.real   # imag orthogonal to real
+        center = hopf["state"]
+
+        def residual(X):
+            x0, T, p = X[:3], X[3] * self.period_scale, X[4]
+            end, monodromy, sensitivity = self.variational(x0, T, p, samples = 2)[:3]
+
+            G = np.concatenate((end - x0, [imag @ (x0 - center), real @ (x0 - center) - amplitude]))
+            DG = np.zeros((5, 5))
+            DG[:3, :3] = monodromy - np.eye(3)
+            DG[:3, 3] = self.f(end, p) * self.period_scale
+            DG[:3, 4] = sensitivity
+            DG[3, :3] = imag
+            DG[4, :3] = real
+
+            return G, DG
+
+        X = np.concatenate((center + amplitude * real, [hopf["period"] / self.period_scale, hopf["parameter"]]))
+        corrected = self.newton(residual, X, max_iter = 30)
+
+        return None if corrected is None else corrected[0]
+
+
+    def orbit_properties(self, X):
+        """Floquet multipliers, stability and extrema of one periodic orbit"""
+        x0, T, p = X[:3], X[3] * self.period_scale, X[4]
+        monodromy, orbit = self.variational(x0, T, p)[1::2]
+        multipliers = np.linalg.eigvals(monodromy)
+        nontrivial = np.delete(multipliers, np.argmin(np.abs(multipliers - 1)))   # one multiplier is always 1 (phase shift)
+
+        return multipliers, np.all(np.abs(nontrivial) < 1), orbit.max(axis = 0), orbit.min(axis = 0), orbit.mean(axis = 0)
+
+
+    def periodic_orbits(self, hopf, amplitude : float = None, max_steps : int = 300, max_period : float = None):
+        """
+        Continuation of the limit cycles that are born at a Hopf point.
+
+        Args:
+            hopf (dict): Hopf point from equilibria
+            amplitude (float): distance of the first orbit from the equilibrium, None takes 1 % of the equilibrium
+            max_steps (int): largest number of orbits
+            max_period (float): the branch ends if the period gets longer (homoclinic orbit), None takes 20 Hopf periods
+
+        Returns:
+            dict: "parameter", "period", "x0" (N, 3), "maxima" (N, 3), "minima" (N, 3), "mean" (N, 3), "floquet" (N, 3), "stable" (N,)
+        """
+        amplitude = amplitude or 0.01 * np.linalg.norm(hopf["state"])
+        max_period = max_period or 20 * hopf["period"]
+        self.period_scale = hopf["period"]
+
+        first = self.hopf_orbit(hopf, amplitude)
+        second = self.hopf_orbit(hopf, 2 * amplitude) if first is not None else None
+
+        if second is None:
+            return {"parameter": np.empty(0), "period": np.empty(0), "x0": np.empty((0, 3)), "maxima": np.empty((0, 3)),
+                    "minima": np.empty((0, 3)), "mean": np.empty((0, 3)), "floquet": np.empty((0, 3)), "stable": np.empty(0, dtype = bool)}
+
+        def correct(X_prediction, X_previous, tangent):
+            return self.newton(self.periodic_residual(X_prediction, X_previous, tangent), X_prediction)
+
+        def stop(X):
+            return X[3] * self.period_scale > max_period or X[3] <= 0 or np.linalg.norm(X[:3] - hopf["state"]) < amplitude / 2
+
+        tangent = (second - first) / np.linalg.norm(second - first)
+        points = [first] + self.trace(second, tangent, correct, max_steps - 1, stop)
+        properties = [self.orbit_properties(X) for X in points]
+        points = np.array(points)
+
+        return {
+            "parameter": points[:, 4],
+            "period": points[:, 3] * self.period_scale,
+            "x0": points[:, :3],
+            "maxima": np.array([i[2] for i in properties]),
+            "minima": np.array([i[3] for i in properties]),
+            "mean": np.array([i[4] for i in properties]),
+            "floquet": np.array([i[0] for i in properties]),
+            "stable": np.array([i[1] for i in properties]),
+        }
+
+
+    # [Diagram]__________________________________________________________________________________________________________________________________
+
+    def diagram(self, x0 = None, max_steps : int = 300):
+        """
+        Whole bifurcation diagram: the equilibrium branch, its Hopf points and the limit cycles of every Hopf point.
+        A cycle branch that connects two Hopf points gets traced from both ends.
+
+        Returns:
+            tuple: (equilibria, list of periodic branches), see equilibria and periodic_orbits
+        """
+        equilibria = self.equilibria(x0)
+
+        return equilibria, [self.periodic_orbits(hopf, max_steps = max_steps) for hopf in equilibria["hopf"]]
+
+
+    def plot(self, par_index : int, normalize : bool = True):
+        """
+        Plotting the diagram. Stable branches are solid, unstable ones dashed, the Hopf points are marked.
+
+        Args:
+            par_index (int): Position of the System-value that we want to plot (x -> 0, y -> 1, z -> 2)
+            normalize (bool): normalizing the extrema of the cycles to their mean (like bifurkation_plot), the equilibria are 1 then
+        """
+        equilibria, cycles = self.diagram()
+        name = ["x", "y", "z"][par_index]
+
+        p = equilibria["parameter"]
+        state = np.ones(len(p)) if normalize else equilibria["state"][:, par_index]
+        stable = equilibria["stable"]
+
+        plt.plot(np.where(stable, p, np.nan), np.where(stable, state, np.nan), 'k')
+        plt.plot(np.where(~ stable, p, np.nan), np.where(~ stable, state, np.nan), 'k--')
+
+        for cycle in cycles:
+            mean = cycle["mean"][:, par_index] if normalize else 1
+            for extrema in (cycle["maxima"][:, par_index] / mean, cycle["minima"][:, par_index] / mean):
+                plt.plot(np.where(cycle["stable"], cycle["parameter"], np.nan), np.where(cycle["stable"], extrema, np.nan), 'g')
+                plt.plot(np.where(~ cycle["stable"], cycle["parameter"], np.nan), np.where(~ cycle["stable"], extrema, np.nan), 'g--')
+
+        for hopf in equilibria["hopf"]:
+            plt.plot(hopf["parameter"], 1 if normalize else hopf["state"][par_index], 'ro')
+
+        plt.ylabel(name + '$_{min}$, ' + name + '$_{max}$')
+        plt.xlabel(self.parameter)
+        plt.xlim(self.p_min, self.p_max)
+        plt.show()
+
+        return None
@@ -0,0 +1,119 @@
+"""
+Decimation for plotting long solutions.
+
+A browser can not draw 100000+ points per trace without stalling, so the plots only get a couple of thousand.
+Plain striding (sol[::100]) would cut off the peaks, so every level of the pyramid keeps the smallest and largest value
+of each bucket (min/max decimation, like LTTB it keeps the visual shape). The levels halve the numbers of points,
+and a zoomed in window is taken from the finest level that still fits, so the plot looks exact at every zoom level.
+"""
+
+import numpy as np
+
+
+# [Pyramid]______________________________________________________________________________________________________________________________________
+
+def minmax_decimate(values, index, bucket : int):
+    """
+    One level of the pyramid. The timepoints in index are cut into buckets, and only the timepoints with the smallest
+    and largest value of every column survive (and the first and last one, so the line still reaches both ends).
+
+    Args:
+        values (array): (N, d) values, for example u and v of a solution
+        index (array): sorted timepoints of the previous level
+        bucket (int): timepoints per bucket
+
+    Returns:
+        array: sorted timepoints of the next level
+    """
+    level = values[index]
+    full = len(index) // bucket * bucket
+
+    blocks = level[:full].reshape(-1, bucket, level.shape[1])
+    offset = (np.arange(len(blocks)) * bucket)[:, None]
+    keep = [(np.concatenate((blocks.argmin(axis = 1), blocks.argmax(axis = 1)), axis = 1) + offset).ravel(), [0, len(index) - 1]]
+
+    if full < len(index):   # last bucket that is not full
+        keep += [full + level[full:].argmin(axis = 0), full + level[full:].argmax(axis = 0)]
+
+    return index[np.unique(np.concatenate(keep))]
+
+
+def pyramid(values, min_points : int = 1000):
+    """
+    All levels of the min/max pyramid of a solution.
+
+    Args:
+        values (array): (N,) or (N, d) values. With several columns (u and v) every level keeps the extrema of all of them,
+                        so the same timepoints work for the time series and the phase portrait
+        min_points (int): the coarsest level has about this many points
+
+    Returns:
+        list: sorted timepoint arrays, from all N timepoints (level 0) to the coarsest level
+    """
+    values = np.asarray(values)
+
+    if values.ndim == 1:
+        values = values[:, None]
+
+    bucket = 4 * values.shape[1]    # every bucket keeps at most 2d timepoints, so every level halves
+    levels = [np.arange(len(values))]
+
+    while len(levels[-1]) > min_points:
+        level = minmax_decimate(values, levels[-1], bucket)
+
+        if len(level) >= len(levels[-1]):
+            break
+
+        levels.append(level)
+
+    return levels
+
+
+def pyramid_window(levels, start : int, stop : int, max_points : int):
+    """
+    Timepoints of a time window out of the finest level that has at most max_points in it.
+
+    Args:
+        levels (list): levels of pyramid()
+        start (int): first visible timepoint
+        stop (int): last visible timepoint (excluded)
+        max_points (int): points per trace
+
+    Returns:
+        array: sorted timepoints, plus one on each side so the line runs through the borders
+    """
+    for level in levels:
+        lower, upper = np.searchsorted(level, [start, stop])
+
+        if upper - lower <= max_points:
+            break
+
+    return level[max(lower - 1, 0) : min(upper + 1, len(level))]
+
+
+def pyramid_box(levels, values, lower, upper, max_points : int):
+    """
+    Timepoints whose values lie inside a box (zoomed in phase portrait) out of the finest level with at most max_points in it.
+    The trajectory leaves and enters the box, so the gaps between the pieces are marked with -1.
+
+    Args:
+        levels (list): levels of pyramid()
+        values (array): (N, d) values the pyramid was built on
+        lower (array): lower corner of the box, -inf for an open side
+        upper (array): upper corner of the box, inf for an open side
+        max_points (int): points per trace
+
+    Returns:
+        array: timepoints with -1 at the gaps
+    """
+    for level in levels:
+        inside = np.all((values[level] >= lower) & (values[level] <= upper), axis = 1)
+
+        if np.count_nonzero(inside) <= max_points:
+            break
+
+    inside = inside | np.r_[inside[1:], False] | np.r_[False, inside[:-1]]  # one point beyond the border on each side
+    position = np.flatnonzero(inside)
+    gaps = np.flatnonzero(np.diff(position) > 1) + 1
+
+    return np.insert(level[position], gaps, -1)
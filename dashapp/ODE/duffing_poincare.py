@@ -4,6 +4,11 @@ import matplotlib.pyplot as plt
 from scipy.integrate import odeint
 from scipy.signal import argrelmax
 from scipy.signal import find_peaks
+from .sweep import SweepExecutor
+from .trajectory import Trajectory
+from .integrators import rk4, dopri5, odeint_window, iter_solve, output_grid
+from .cache import solution_cache, hash_key
+from functools import partial
 
 def duffing(par, t, gamma, alpha, omega):
     x, y, z = par
@@ -14,26 +19,379 @@ def duffing(par, t, gamma, alpha, omega):
 
     return [dx, dy, dz]
 
+def duffing_vectorized(par, t, gamma, alpha, omega):
+    """Duffing equations for a whole ensemble of states at once (for the integrators in integrators.py).
+
+    Args:
+        par (array): (M, 3) u, v, w values of every member
+        t (float or array): time
+        gamma (float or array): damping, scalar or (M,)
+        alpha (float or array): driving force, scalar or (M,)
+        omega (float or array): driving frequency, scalar or (M,)
+
+    Returns:
+        Array: (M, 3) du, dv, dw of every member
+    """
+    x, y, z = np.reshape(par, (-1, 3)).T
+
+    dx = (y)
+    dy = (-x - x**3 - gamma * y + alpha * np.cos( 2 * np.pi * z))
+    dz = (omega / (2 * np.pi)) * np.ones_like(z)
+
+    return np.stack((dx, dy, dz), axis = -1).reshape(np.shape(par))
+
+def duffing_jacobian(par, t, gamma, alpha, omega):
+    """Analytic Jacobian of the Duffing equations (Dfun for odeint)
+
+    Returns:
+        array: (3, 3) Jacobian, J[i, j] = d(f_i)/d(par_j)
+    """
+    x, y, z = par
+
+    return np.array([
+        [0, 1, 0],
+        [-1 - 3 * x**2, - gamma, - 2 * np.pi * alpha * np.sin(2 * np.pi * z)],
+        [0, 0, 0]
+    ])
+
+def duffing_sweep_point(value, parameter, par, t, gamma, alpha, omega, keep):
+    """
+    Solving the Duffing equations for one value of the changed parameter and only returning the maxima of u.
+    This is the worker function of the parallel sweeps, so it has to stay on module level (picklable).
+
+    Args:
+        value (float): value of the changed parameter
+        parameter (str): name of the changed parameter -> "gamma", "alpha" or "omega"
+        par (list): u, v, w initial values
+        t (array): timespan
+        gamma (float): damping
+        alpha (float): driving force
+        omega (float): driving frequency
+        keep (int): last couple of timepoints that we want to look at
+
+    Returns:
+        Array: 1D Array with the u-values of all maxima in the kept timepoints
+    """
+    constants = {"gamma" : gamma, "alpha" : alpha, "omega" : omega}
+    constants[parameter] = value
+
+    sol = odeint_window(duffing, par, t, keep, args = (constants["gamma"], constants["alpha"], constants["omega"]), Dfun = duffing_jacobian)
+    u = sol[:, 0]   # the transient part was never stored
+
+    return u[find_peaks(u)[0]]
+
+def duffing_grid_point(x, y, x_name : str, y_name : str, par, t, gamma, alpha, omega, keep, decimals : int = 3):
+    """
+    One point of a two parameter sweep (worker function of Duffing.heatmap).
+
+    Args:
+        x (float): value of the first parameter
+        y (float): value of the second parameter
+        x_name (str): name of the first parameter -> "gamma", "alpha" or "omega"
+        y_name (str): name of the second parameter
+        decimals (int): maxima that agree to this many decimals count as the same
+        the others are the ones of duffing_sweep_point
+
+    Returns:
+        Array: [numbers of different maxima of u (1 -> period 1, 2 -> period 2, many -> chaos), largest u, smallest u]
+    """
+    constants = {"gamma" : gamma, "alpha" : alpha, "omega" : omega}
+    constants[x_name] = x
+    constants[y_name] = y
+
+    sol = odeint_window(duffing, par, t, keep, args = (constants["gamma"], constants["alpha"], constants["omega"]), Dfun = duffing_jacobian)
+    u = sol[:, 0]
+
+    return np.array([len(np.unique(np.round(u[find_peaks(u)[0]], decimals))), u.max(), u.min()])
+
+def duffing_blocks(par, t, gamma, alpha, omega, chunk : int = 10000, progress = None):
+    """
+    Solving the Duffing equations in blocks of chunk timepoints (iter_solve, solve_ivp LSODA). The background jobs of the Dash app
+    and the page itself (when a solution is missing) both integrate with it, so a solution in the store does not depend on who made it.
+
+    Args:
+        par (list): u, v, w initial values
+        t (array): timespan
+        gamma (float): damping
+        alpha (float): driving force
+        omega (float): driving frequency
+        chunk (int): timepoints per block
+        progress (multiprocessing.Value): time that was reached, None does not report it
+
+    Returns:
+        Array: (len(t), 3) solution for u, v, w
+    """
+    blocks = []
+
+    for t_block, sol_block in Duffing(par, t, gamma, alpha, omega).iter_solve(chunk):
+        blocks.append(sol_block)
+
+        if progress is not None:
+            progress.value = t_block[-1]
+
+    return np.concatenate(blocks)
+
+def duffing_job(key, par, t, gamma, alpha, omega, store, chunk : int = 10000, progress = None):
+    """
+    Background solve of the Dash app (worker function of the JobTable, so it has to stay on module level).
+    The Duffing equations are integrated in blocks of chunk timepoints (iter_solve). After every block the time that was reached
+    goes into progress, and at the end the solution is saved in the store under key, where the page picks it up.
+
+    Args:
+        key (str): key of the solution in the store
+        par (list): u, v, w initial values
+        t (array): timespan
+        gamma (float): damping
+        alpha (float): driving force
+        omega (float): driving frequency
+        store (ResultStore): store on disk that is shared with the server
+        chunk (int): timepoints per block
+        progress (multiprocessing.Value): time that was reached
+    """
+    if key in store:
+        return
+
+    store.save(key, duffing_blocks(par, t, gamma, alpha, omega, chunk, progress), model = "duffing")
+
+def poincare_job(key, par, gamma, alpha, omega, n_points, transient_periods, path, store, batch : int = 1000, progress = None):
+    """
+    Background Poincare section of the Dash app (worker function of the JobTable). The section points come in batches from
+    iter_poincare, so the trajectory is never stored. Every batch is written into the memory mapped file path right away
+    and progress counts the points that are ready, so the page can already show them while the rest is computed.
+    At the end the whole section is saved in the store under key.
+
+    Args:
+        key (str): key of the section in the store
+        par (list): u, v, w initial values
+        gamma (float): damping
+        alpha (float): driving force
+        omega (float): driving frequency
+        n_points (int): numbers of section points
+        transient_periods (int): driving periods that are skipped before recording
+        path (str): .npy file for the (n_points, 2) u, v section points
+        store (ResultStore): store on disk that is shared with the server
+        batch (int): section points per batch
+        progress (multiprocessing.Value): numbers of points that are in path
+    """
+    section = np.lib.format.open_memmap(path, mode = "w+", dtype = float, shape = (n_points, 2))
+    start = 0
+
+    for t_batch, points in Duffing(par, np.array([0.0]), gamma, alpha, omega).iter_poincare(n_points, transient_periods, batch):
+        section[start : start + len(points)] = points[:, :2]
+        section.flush()
+        start += len(points)
+
+        if progress is not None:
+            progress.value = start
+
+    store.save(key, np.array(section), model = "poincare")
+
+def maxima_distance(a, b, decimals : int = 3):
+    """
+    Distance of the maxima of two neighbouring values for the adaptive sweeps. If the numbers of different maxima changes
+    (period doubling, chaos), the distance is infinite, otherwise it is the relative change of the smallest and largest maximum.
+
+    Args:
+        a (array): maxima of u of the left value
+        b (array): maxima of u of the right value
+        decimals (int): maxima that agree to this many decimals count as the same
+
+    Returns:
+        float: distance
+    """
+    if len(np.unique(np.round(a, decimals))) != len(np.unique(np.round(b, decimals))):
+        return np.inf
+
+    if len(a) == 0:
+        return 0
+
+    ends_a = np.array([np.min(a), np.max(a)])
+    ends_b = np.array([np.min(b), np.max(b)])
+
+    return np.max(np.abs(ends_a - ends_b) / np.maximum((np.abs(ends_a) + np.abs(ends_b)) / 2, 1e-12))
+
+def duffing_basin_tile(par, gamma, alpha, omega, transient_periods, sample_periods, steps_per_period):
+    """
+    Stroboscopic map of one tile of a basin image. All initial values of the tile are integrated together as one
+    vectorized ensemble (rk4), and only the states at the last sample_periods driving periods are sent back.
+    This is the worker function of the basin maps, so it has to stay on module level (picklable).
+
+    Args:
+        par (array): (M, 3) initial values u, v, w of the pixels
+        gamma (float): damping
+        alpha (float): driving force
+        omega (float): driving frequency
+        transient_periods (int): driving periods until the pixels sit on their attractor
+        sample_periods (int): driving periods that are recorded after the transient
+        steps_per_period (int): rk4 steps in one driving period
+
+    Returns:
+        Array: (M, sample_periods, 2) u, v at the recorded stroboscopic times
+    """
+    strobe = np.arange(transient_periods + sample_periods + 1) * 2 * np.pi / omega
+
+    with np.errstate(all = "ignore"):    # some pixels can run away, they end up as nan/inf and get the label -1
+        sol = rk4(duffing_vectorized, par, strobe, (gamma, alpha, omega), steps_per_period)
+
+    return np.moveaxis(sol[-sample_periods:, :, :2], 0, 1)
+
 # [Duffing]________________________________________________________________________________________________________________________________________
 class Duffing:
-    def __init__(self, par, t, gamma, alpha, omega):
+    def __init__(self, par, t, gamma, alpha, omega, store = None, output_step : float = None, dtype = float):
+        """
+        Args:
+            par (list): u, v, w initial values
+            t (array): timespan
+            gamma (float): damping
+            alpha (float): driving force
+            omega (float): driving frequency
+            store (ResultStore): persistent store on disk that is asked before integrating, None keeps everything in memory
+            output_step (float): only storing every output_step time units (a multiple of the steps of t). odeint keeps its own
+                                 internal steps, so the accuracy does not change. t becomes the thinned out grid and keep counts its timepoints
+            dtype: dtype of the stored trajectory, for example np.float32 or np.float16. The integration itself always runs in float64
+        """
         self.par = par
-        self.t = t
+        self.t, self.stride = output_grid(t, output_step)
         self.gamma = gamma
         self.alpha = alpha
         self.omega = omega
+        self.store = store
+        self.dtype = np.dtype(dtype)
+        self.trajectory_key = None
+        self.trajectory_cache = None
 
     
     def duffing_solver(self):
+        """solving the duffing equations. The solution is only integrated once, see trajectory()
+
+        Returns:
+            Array: (len(t), 3) solution for u, v, w
+        """
+        return self.trajectory().sol
+
+
+    def trajectory(self):
+        """
+        Lazy and cached solution of the Duffing equations. The trajectory gets integrated the first time
+        it is needed, and every later call (x_solv, y_solv, z_solv...) uses the same solution array.
+        If one of the parameters was changed in the meantime, a new trajectory is created.
+        With a store, the solution is looked up on disk first (memory mapped) and only integrated if it is missing.
+
+        Returns:
+            Trajectory: trajectory with the components u, v, w
+        """
+        par = self.par
+        t = self.t
+        gamma = self.gamma
+        alpha = self.alpha
+        omega = self.omega
+
+        dtype = self.dtype
+
+        key = hash_key("duffing", par, t, gamma, alpha, omega, dtype.str)   # the contents of t, a freed array can give its id to a new one
+
+        if self.trajectory_key != key:
+            self.trajectory_key = key
+            solve = lambda: odeint(duffing, par, t, args = (gamma, alpha, omega), Dfun = duffing_jacobian).astype(dtype, copy = False)
+
+            if self.store is not None:
+                solve = partial(self.store.get_or_solve, key, solve, model = "duffing")
+
+            self.trajectory_cache = Trajectory(solve, t, ["u", "v", "w"])
+
+        return self.trajectory_cache
+    
+
+    def iter_solve(self, chunk : int = 100000, method : str = "LSODA"):
+        """
+        Streaming version of duffing_solver. The solution is handed out in blocks of chunk timepoints while the solver keeps running.
+
+        Args:
+            chunk (int): timepoints per block
+            method (str): solve_ivp method, "LSODA" like odeint
+
+        Yields:
+            tuple: (t_block, sol_block) -> timepoints and the (len(t_block), 3) solution
+        """
+        gamma = self.gamma
+        alpha = self.alpha
+        omega = self.omega
+
+        yield from iter_solve(lambda time, par: duffing(par, time, gamma, alpha, omega), self.t, self.par, chunk, method,
+                              jac = lambda time, par: duffing_jacobian(par, time, gamma, alpha, omega))
+    
+
+    def iter_poincare(self, n_points : int = None, transient_periods : int = 0, batch : int = 1000):
+        """
+        Stroboscopic Poincare section. The phase w = omega/(2π) * t + w0 crosses an integer once per driving period,
+        and only the states at these crossings get recorded. dw/dt is constant, so the crossing times are known exactly,
+        t_k = (k - w0) * 2π/omega, and the states at them come from the dense output of odeint (one call per batch).
+        The trajectory itself is never stored, so the memory does not grow with the numbers of periods.
+
+        Args:
+            n_points (int): numbers of section points. None takes all crossings inside the timespan t
+            transient_periods (int): driving periods that are skipped before recording (transient part)
+            batch (int): section points per yielded block
+
+        Yields:
+            tuple: (t_batch, points_batch) -> crossing times and the (len(t_batch), 3) u, v, w at them
+
+        Raises:
+            ValueError: if transient_periods is negative or omega is not positive (no driving period to strobe with)
+        """
         par = self.par
         t = self.t
         gamma = self.gamma
         alpha = self.alpha
         omega = self.omega
 
-        sol = odeint(duffing, par, t, args = (gamma, alpha, omega))
+        if transient_periods < 0:
+            raise ValueError(f"transient_periods can not be negative, got {transient_periods}")
+
+        if omega <= 0:
+            raise ValueError(f"omega has to be positive for a stroboscopic section, got {omega}")
 
-        return sol
+        driving_period = 2 * np.pi / omega
+        first = np.floor(par[2]) + 1 + transient_periods       # first integer level of w that gets recorded
+        t_first = t[0] + (first - par[2]) * driving_period
+
+        if n_points is None:
+            n_points = max(int(np.floor((t[-1] - t_first) / driving_period)) + 1, 0)
+
+        time = t[0]
+        state = np.asarray(par, dtype = float)
+
+        for start in range(0, n_points, batch):
+            t_batch = t_first + np.arange(start, min(start + batch, n_points)) * driving_period
+            span = np.concatenate(([time], t_batch))
+
+            # without output points in the transient odeint needs more internal steps per call than the default 500
+            points = odeint(duffing, state, span, args = (gamma, alpha, omega), Dfun = duffing_jacobian,
+                            mxstep = 500 * (1 + int((span[1] - span[0]) / driving_period)))[1:]
+
+            time = t_batch[-1]
+            state = points[-1]
+
+            yield t_batch, points
+
+
+    def poincare_section(self, n_points : int = None, transient_periods : int = 0):
+        """
+        All points of the stroboscopic Poincare section in one array (see iter_poincare)
+
+        Args:
+            n_points (int): numbers of section points. None takes all crossings inside the timespan t
+            transient_periods (int): driving periods that are skipped before recording
+
+        Returns:
+            Array: (n_points, 3) u, v, w at the crossings
+        """
+        batches = [points for _, points in self.iter_poincare(n_points, transient_periods)]
+
+        if not batches:
+            return np.empty((0, 3))
+
+        return np.concatenate(batches)
     
 
     def x_solv(self, keep):
@@ -41,12 +399,10 @@ class Duffing:
 
         Args:
             keep (int): last couple of timepoints that we want to see
+        Returns:
+            Array: 1D view of the X-Solution
         """
-        sol = self.duffing_solver()
-
-        x_solv = sol[-keep:,0]
-
-        return x_solv
+        return self.trajectory().tail(keep).u
     
 
     def y_solv(self, keep):
@@ -55,13 +411,9 @@ class Duffing:
         Args:
             keep (int): last couple of timepoints that we want to see
         Returns:
-            Array: 1D Array of the Y-Solution
+            Array: 1D view of the Y-Solution
         """
-        sol = self.duffing_solver()
-
-        y_solv = sol[-keep:,1]
-
-        return y_solv
+        return self.trajectory().tail(keep).v
     
 
     def z_solv(self, keep):
@@ -70,14 +422,195 @@ class Duffing:
         Args:
             keep (int): last couple of timepoints that we want to see
         Returns:
-            Array: 1D Array of the 2-Solution
+            Array: 1D view of the 2-Solution
         """
-        sol = self.duffing_solver()
+        return self.trajectory().tail(keep).w
+    
 
-        z_solv = sol[-keep:,2]
+    def initial_ensemble_solver(self, par, method : str = "dopri5", rtol : float = 1e-6, atol : float = 1e-9, substeps : int = 1):
+        """
+        Solving the Duffing equations for many initial values at once with the NumPy ensemble integrators.
+
+        Args:
+            par (array): (M, 3) initial values u, v, w of every member
+            method (str): "dopri5" (adaptive step for every member) or "rk4" (fixed step, the steps of t)
+            rtol (float): relative tolerance of dopri5
+            atol (float): absolute tolerance of dopri5
+            substeps (int): rk4 steps between two timepoints of t (of the original timespan, before output_step thinned it out)
+
+        Returns:
+            Array: (len(t), M, 3) solution as dtype
+        """
+        args = (self.gamma, self.alpha, self.omega)
+
+        if method == "rk4":
+            return rk4(duffing_vectorized, par, self.t, args, substeps * self.stride).astype(self.dtype, copy = False)
+
+        return dopri5(duffing_vectorized, par, self.t, args, rtol = rtol, atol = atol).astype(self.dtype, copy = False)
+
+
+    def basin_strobes(self, u, v, tile : int = 4096, transient_periods : int = 100, sample_periods : int = 8,
+                      steps_per_period : int = 100, max_workers : int = None):
+        """
+        Stroboscopic samples for every initial value of a (u, v) grid. The grid is cut into tiles of pixels that run in
+        parallel (SweepExecutor). Tiles that are still in the solution cache are not integrated again, but the cache can evict them (LRU),
+        so the results are collected per tile here and never read back from it.
+
+        Args:
+            u (array): u values of the grid
+            v (array): v values of the grid
+            tile (int): pixels per tile
+            transient_periods (int): driving periods until the pixels sit on their attractor
+            sample_periods (int): driving periods that are recorded after the transient
+            steps_per_period (int): rk4 steps in one driving period
+            max_workers (int): numbers of worker processes, None takes all cores
+
+        Returns:
+            Array: (len(v), len(u), sample_periods, 2) u, v at the recorded stroboscopic times
+        """
+        uu, vv = np.meshgrid(u, v)
+        par = np.column_stack((uu.ravel(), vv.ravel(), np.full(uu.size, float(self.par[2]))))
+        tiles = [par[i : i + tile] for i in range(0, len(par), tile)]
+
+        settings = (self.gamma, self.alpha, self.omega, transient_periods, sample_periods, steps_per_period)
+        keys = [hash_key("duffing_basin_tile", i, *settings) for i in tiles]
+        strobes = [solution_cache.get(key) for key in keys]     # the cache only saves work, the results are kept here
+        missing = [i for i, strobe in enumerate(strobes) if strobe is None]
+
+        executor = SweepExecutor(max_workers, chunksize = 1)
+        computed = executor.imap(duffing_basin_tile, [tiles[i] for i in missing], gamma = self.gamma, alpha = self.alpha, omega = self.omega,
+                                 transient_periods = transient_periods, sample_periods = sample_periods, steps_per_period = steps_per_period)
+
+        for i, strobe in zip(missing, computed):
+            strobes[i] = solution_cache.put(keys[i], strobe)
+
+        strobes = np.concatenate(strobes)
+
+        return strobes.reshape(len(v), len(u), sample_periods, 2)
+
+
+    def basins(self, grid = 512, u_range = (-3, 3), v_range = (-3, 3), tol : float = 1e-2, **options):
+        """
+        Basin of attraction map of the driven Duffing oscillator. Every pixel is an initial value (u, v, w0),
+        and it gets the label of the attractor it lands on. Two pixels belong to the same attractor if the last point
+        of their stroboscopic map lies close (tol) to one of the recorded points of the attractor, so a period 3 orbit
+        is found no matter at which of its 3 points a pixel arrives.
+
+        Args:
+            grid (int or tuple): pixels in u and v direction. One int gives a square image
+            u_range (tuple): (u_min, u_max)
+            v_range (tuple): (v_min, v_max)
+            tol (float): distance in the (u, v) plane to count as the same attractor
+            **options: tile, transient_periods, sample_periods, steps_per_period, max_workers (see basin_strobes)
+
+        Returns:
+            Array, Array, Array, list: u values, v values, (len(v), len(u)) labels (-1 for pixels that ran away)
+                                        and the recorded stroboscopic points of every attractor
+        """
+        nu, nv = (grid, grid) if np.isscalar(grid) else grid
+        u = np.linspace(u_range[0], u_range[1], nu)
+        v = np.linspace(v_range[0], v_range[1], nv)
+
+        strobes = self.basin_strobes(u, v, **options).reshape(nu * nv, -1, 2)
+        last = strobes[:, -1]
+
+        labels = np.full(len(last), -1)
+        unlabeled = np.flatnonzero(np.all(np.isfinite(strobes), axis = (1, 2)))
+        attractors = []
+
+        while len(unlabeled):
+            points = strobes[unlabeled[0]]
+            distance = np.min(np.linalg.norm(last[unlabeled, None, :] - points[None, :, :], axis = -1), axis = 1)
+            member = distance < tol
+
+            labels[unlabeled[member]] = len(attractors)
+            attractors.append(np.unique(np.round(points / tol) * tol, axis = 0))
+            unlabeled = unlabeled[~member]
+
+        return u, v, labels.reshape(nv, nu), attractors
+
+
+    def bifurcation_values(self, parameter : str, start : float, stop : float, step : float, keep : int, max_workers : int = None, chunksize : int = None):
+        """
+        Bifurcation sweep over one of the constants. Every value gets solved in a worker process (ProcessPoolExecutor)
+        and only the maxima of u are sent back, not the whole trajectories.
+
+        Args:
+            parameter (str): constant that will be changed -> "gamma", "alpha" or "omega"
+            start (float): First value of the interval
+            stop (float): Last value of the interval
+            step (float): Steps of the interval
+            keep (int): last couple of timepoints that we want to see
+            max_workers (int): numbers of worker processes, None takes all cores
+            chunksize (int): values per task, None chooses it by itself
+
+        Returns:
+            Array, List: the changed values and for every value an 1D Array with the maxima of u
+        """
+        values = np.arange(start, stop, step)
+        executor = SweepExecutor(max_workers, chunksize)
+
+        solve = lambda: executor.map(duffing_sweep_point, values, parameter = parameter, par = self.par, t = self.t,
+                                     gamma = self.gamma, alpha = self.alpha, omega = self.omega, keep = keep)
+
+        if self.store is None:
+            return values, solve()
+
+        key = hash_key("duffing_sweep", parameter, values, self.par, self.t, self.gamma, self.alpha, self.omega, keep)
+
+        return values, self.store.get_or_solve(key, solve, model = "duffing_sweep")
+
+
+    def bifurcation_adaptive(self, parameter : str, start : float, stop : float, keep : int, budget : int = 300, initial : int = 33,
+                             threshold : float = 0.05, max_workers : int = None, chunksize : int = None):
+        """
+        Adaptive version of bifurcation_values. The sweep starts on a coarse grid and only refines the intervals where the maxima
+        of u move by more than threshold or where the numbers of different maxima changes (period doubling, chaos).
+
+        Args:
+            parameter (str): constant that will be changed -> "gamma", "alpha" or "omega"
+            start (float): First value of the interval
+            stop (float): Last value of the interval (it is included)
+            keep (int): last couple of timepoints that we want to see
+            budget (int): total numbers of solves
+            initial (int): numbers of values of the coarse grid
+            threshold (float): largest relative change between two neighbouring values that is not refined
+            max_workers (int): numbers of worker processes, None takes all cores
+            chunksize (int): values per task, None chooses it by itself
+
+        Returns:
+            Array, List: the changed values and for every value an 1D Array with the maxima of u
+        """
+        executor = SweepExecutor(max_workers, chunksize)
+
+        return executor.refine(duffing_sweep_point, start, stop, budget, initial, threshold, distance = maxima_distance,
+                               parameter = parameter, par = self.par, t = self.t, gamma = self.gamma, alpha = self.alpha,
+                               omega = self.omega, keep = keep)
+
+
+    def heatmap(self, x_name : str, x_values, y_name : str, y_values, keep : int, path : str, tile : int = 16, max_workers : int = None):
+        """
+        Two parameter sweep, for example over (alpha, omega). The grid is solved in tiles on all cores, and every finished tile
+        is written to path right away (see SweepExecutor.grid), so an interrupted sweep continues where it stopped.
+
+        Args:
+            x_name (str): first constant -> "gamma", "alpha" or "omega"
+            x_values (list or array): values of the first constant
+            y_name (str): second constant
+            y_values (list or array): values of the second constant
+            keep (int): last couple of timepoints that we want to look at
+            path (str): folder of the results
+            tile (int): edge length of the tiles
+            max_workers (int): numbers of worker processes, None takes all cores
+
+        Returns:
+            Array: memory mapped (len(y_values), len(x_values), 3) array -> [numbers of different maxima, largest u, smallest u]
+        """
+        executor = SweepExecutor(max_workers)
+
+        return executor.grid(duffing_grid_point, x_values, y_values, path, fields = (3,), tile = tile, x_name = x_name, y_name = y_name,
+                             par = self.par, t = self.t, gamma = self.gamma, alpha = self.alpha, omega = self.omega, keep = keep)
 
-        return z_solv
-    
 
     # def duffing_matrixsolver(self):
 
@@ -3,6 +3,37 @@ import matplotlib.pyplot as plt
 from scipy.integrate import odeint
 from scipy.signal import argrelmax
 from scipy.signal import find_peaks
+from functools import partial
+from .sweep import SweepExecutor
+from .cache import solution_cache, hash_key
+from .integrators import rk4, dopri5, odeint_window, odeint_until_converged, solve_extrema, iter_solve, output_grid
+
+
+parameters = {
+    "v1": ("v", 0), "v2": ("v", 1), "v3": ("v", 2), "v4": ("v", 3), "v5": ("v", 4), "v6": ("v", 5),
+    "k1": ("k", 0), "k2": ("k", 1), "k4": ("k", 2), "k6": ("k", 3),
+    "n": ("n", None), "c": ("c", None),
+}   # name -> (argument, position) of every parameter of the Goodwin models
+
+
+def with_parameters(v, k, n, values : dict):
+    """
+    Copies of v, k, n with some parameters changed, for example with_parameters(v, k, n, {"v2": 0.5, "n": 9})
+
+    Returns:
+        tuple: v, k, n
+    """
+    arguments = {"v": list(v), "k": list(k), "n": n}
+
+    for name, value in values.items():
+        argument, index = parameters[name]
+
+        if index is None:
+            arguments[argument] = value
+        else:
+            arguments[argument][index] = value
+
+    return arguments["v"], arguments["k"], arguments["n"]
 
 
 def goodwin(par , t , v , k , n : int):
@@ -45,6 +76,225 @@ def goodwin_with_positive_loop(par , t , v , k , n : int, c : int):
 
     return [dx, dy, dz]
 
+def goodwin_vectorized(par, t, v, k, n):
+    """Goodwill-Oscillator models for a whole ensemble of parameter sets at once.
+    Same equations as goodwin(), but every member of the ensemble gets its own v, k and n.
+
+    The state is a (M, 3) block [[x_0, y_0, z_0], [x_1, y_1, z_1], ...]. odeint only takes 1D arrays,
+    so the block can also be passed flattened. The derivatives come back in the same shape as par.
+
+    Args:
+        par (ndarray): (M, 3) or flattened (3M,) x, y, z values of every member
+        t (float): time
+        v (ndarray): (M, 6) or (6,) v1, v2, v3, v4, v5, v6
+        k (ndarray): (M, 4) or (4,) K1, K2, K4, K6
+        n (ndarray or int): (M,) or scalar Hill coefficient
+
+    Returns:
+        ndarray: dx, dy, dz for every member, same shape as par
+    """
+    x, y, z = np.reshape(par, (-1, 3)).T
+    v1, v2, v3, v4, v5, v6 = np.asarray(v).T
+    k1, k2, k4, k6 = np.asarray(k).T
+
+    dx = (v1 * (k1**n / (k1**n + z**n))) - (v2 * (x / (k2 + x)))
+    dy = (v3 * x) - (v4 * ( y / (k4 + y)))
+    dz = (v5 * y) - (v6 * (z / (k6 + z)))
+
+    return np.stack((dx, dy, dz), axis = -1).reshape(np.shape(par))
+
+def goodwin_jacobian(par , t , v , k , n : int):
+    """Analytic Jacobian of the Goodwin model (Dfun for odeint). With a high Hill coefficient the system gets stiff,
+    so without this LSODA would build the Jacobian with finite differences and extra RHS calls.
+
+        d(dx)/dx = - v2 * K2/(K2+x)^2            d(dx)/dz = - v1 * n * K1^n * z^(n-1)/(K1^n+z^n)^2
+
+        d(dy)/dx = v3                            d(dy)/dy = - v4 * K4/(K4+y)^2
+
+        d(dz)/dy = v5                            d(dz)/dz = - v6 * K6/(K6+z)^2
+
+    Returns:
+        array: (3, 3) Jacobian, J[i, j] = d(f_i)/d(par_j)
+    """
+
+    x,y,z = par
+    v1, v2, v3, v4, v5, v6 = v
+    k1,k2,k4,k6 = k
+
+    return np.array([
+        [- v2 * k2 / (k2 + x)**2, 0, - v1 * n * k1**n * z**(n - 1) / (k1**n + z**n)**2],
+        [v3, - v4 * k4 / (k4 + y)**2, 0],
+        [0, v5, - v6 * k6 / (k6 + z)**2]
+    ])
+
+def goodwin_with_positive_loop_jacobian(par , t , v , k , n : int, c : int):
+    """Analytic Jacobian of the Goodwin model with the positive feedbackloop on x (Dfun for odeint)
+
+        d(dx)/dx = v1 * c * K1^n/(K1^n+z^n) - v2 * K2/(K2+x)^2
+
+        d(dx)/dz = - v1 * (1 + c*x) * n * K1^n * z^(n-1)/(K1^n+z^n)^2
+
+    The y and z rows are the same as in goodwin_jacobian.
+
+    Returns:
+        array: (3, 3) Jacobian, J[i, j] = d(f_i)/d(par_j)
+    """
+
+    x,y,z = par
+    v1, v2, v3, v4, v5, v6 = v
+    k1,k2,k4,k6 = k
+
+    return np.array([
+        [v1 * c * k1**n / (k1**n + z**n) - v2 * k2 / (k2 + x)**2, 0, - v1 * (1 + c*x) * n * k1**n * z**(n - 1) / (k1**n + z**n)**2],
+        [v3, - v4 * k4 / (k4 + y)**2, 0],
+        [0, v5, - v6 * k6 / (k6 + z)**2]
+    ])
+
+def goodwin_vectorized_jacobian(par, t, v, k, n):
+    """Analytic Jacobian of goodwin_vectorized in the banded form of odeint (ml = mu = 2).
+    The members do not interact, so the full Jacobian is block diagonal with the (3, 3) goodwin_jacobian blocks.
+    odeint wants the bands as rows: jac[i - j + 2, j] = d(f_i)/d(par_j).
+
+    Args:
+        par (ndarray): flattened (3M,) x, y, z values of every member
+        t (float): time
+        v (ndarray): (M, 6) or (6,) v1, v2, v3, v4, v5, v6
+        k (ndarray): (M, 4) or (4,) K1, K2, K4, K6
+        n (ndarray or int): (M,) or scalar Hill coefficient
+
+    Returns:
+        ndarray: (5, 3M) banded Jacobian
+    """
+    x, y, z = np.reshape(par, (-1, 3)).T
+    v1, v2, v3, v4, v5, v6 = np.asarray(v).T
+    k1, k2, k4, k6 = np.asarray(k).T
+
+    jac = np.zeros((5, np.size(par)))
+
+    jac[2, 0::3] = - v2 * k2 / (k2 + x)**2                               # d(dx)/dx
+    jac[3, 0::3] = v3                                                   # d(dy)/dx
+    jac[2, 1::3] = - v4 * k4 / (k4 + y)**2                               # d(dy)/dy
+    jac[3, 1::3] = v5                                                   # d(dz)/dy
+    jac[0, 2::3] = - v1 * n * k1**n * z**(n - 1) / (k1**n + z**n)**2       # d(dx)/dz
+    jac[2, 2::3] = - v6 * k6 / (k6 + z)**2                               # d(dz)/dz
+
+    return jac
+
+def goodwin_sweep_point(v, par, t, k, n, t_step, t_last):
+    """
+    Solving the Goodwin equations for one v-parameter set and only returning the reduction that the bifurcation plots need.
+    This is the worker function of the parallel sweeps, so it has to stay on module level (picklable).
+
+    Args:
+        v (ndarray or list): v1, v2, v3, v4, v5, v6
+        par (ndarray or list): x, y, z initial values
+        t (ndarray): timespan
+        k (ndarray or list): K1, K2, K4, K6
+        n (int): Hill coefficient
+        t_step (float): steps of the timespan
+        t_last (int): last part of the solution that will be kept (removing the transient part)
+
+    Returns:
+        ndarray: (3, 3) array -> [maxima, minima, periods] of the mean normalized x, y, z
+    """
+    keep = int(t_last / t_step)
+    sol = odeint_window(goodwin, par, t, keep, args= (v, k, n), Dfun = goodwin_jacobian)   # the transient part is not stored
+    norm = sol / np.mean(sol, axis = 0)   # normalizing to mean
+
+    period = []
+    for i in range(norm.shape[1]):
+        peaks = find_peaks(norm[:, i])[0]
+        period.append(np.mean(np.diff(peaks)) * t_step if len(peaks) > 1 else np.nan)
+
+    return np.array([norm.max(axis = 0), norm.min(axis = 0), period])
+
+
+def goodwin_event_point(v, par, t, k, n, t_last):
+    """
+    Same reduction as goodwin_sweep_point, but the maxima, minima and periods are located during the integration
+    as roots of dx/dt = 0 (solve_extrema). The extrema times are accurate far below t_step and no output grid gets allocated.
+
+    Args:
+        v (ndarray or list): v1, v2, v3, v4, v5, v6
+        par (ndarray or list): x, y, z initial values
+        t (ndarray): timespan, only its first and last value are used
+        k (ndarray or list): K1, K2, K4, K6
+        n (int): Hill coefficient
+        t_last (int): last part of the solution [h] where the extrema are recorded (removing the transient part)
+
+    Returns:
+        ndarray: (3, 3) array -> [maxima, minima, periods] of the mean normalized x, y, z
+    """
+    events = solve_extrema(goodwin, par, t, t[-1] - t_last, args = (v, k, n), jac = goodwin_jacobian)
+
+    return event_reduction(events)
+
+
+def goodwin_value_point(value, v, v_index, par, t, k, n, t_last):
+    """
+    goodwin_event_point for one value of the changed v-parameter (worker function of the adaptive sweeps).
+
+    Args:
+        value (float): value of the changed v-parameter
+        v (ndarray or list): v1, v2, v3, v4, v5, v6
+        v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
+
+    Returns:
+        ndarray: (3, 3) array -> [maxima, minima, periods] of the mean normalized x, y, z
+    """
+    v = list(v)
+    v[v_index] = value
+
+    return goodwin_event_point(v, par, t, k, n, t_last)
+
+
+def goodwin_grid_point(x, y, x_name : str, y_name : str, v, k, n, par, t, t_last):
+    """
+    goodwin_event_point for one point of a two parameter sweep (worker function of Goodwin.heatmap).
+
+    Args:
+        x (float): value of the first parameter
+        y (float): value of the second parameter
+        x_name (str): name of the first parameter ("v1" ... "v6", "k1", "k2", "k4", "k6", "n")
+        y_name (str): name of the second parameter
+
+    Returns:
+        ndarray: (3, 3) array -> [maxima, minima, periods] of the mean normalized x, y, z
+    """
+    v, k, n = with_parameters(v, k, n, {x_name: x, y_name: y})
+
+    return goodwin_event_point(v, par, t, k, n, t_last)
+
+
+def event_reduction(events, amplitude_tol : float = 1e-3):
+    """
+    Oscillations whose amplitude is below amplitude_tol of the mean (the last wiggles of a damped oscillation) count as fixed point.
+    The normalization uses the mean over whole cycles, so the extrema do not jump with the position of the window.
+
+    Args:
+        events (dict): output of solve_extrema
+        amplitude_tol (float): smallest (max - min) / mean that counts as oscillation
+
+    Returns:
+        ndarray: (3, 3) array -> [maxima, minima, periods] of the mean normalized x, y, z
+    """
+    mean = events["cycle_mean"]
+
+    maxi = []
+    mini = []
+    period = []
+    for i in range(len(mean)):
+        maxima = events["maxima"][i]
+        minima = events["minima"][i]
+        final = events["final"][i]
+
+        maxi.append(max(maxima.max(initial = final), final) / mean[i])     # no extrema -> fixed point
+        mini.append(min(minima.min(initial = final), final) / mean[i])
+        oscillating = len(maxima) > 1 and maxi[-1] - mini[-1] > amplitude_tol
+        period.append(np.mean(np.diff(events["maxima_t"][i])) if oscillating else np.nan)
+
+    return np.array([maxi, mini, period])
+
 
 # [Marta del Olmo]____________________________________________________________________________________________________
 
@@ -71,7 +321,8 @@ class Goodwin:
     """
 
 
-    def __init__(self, par, t, v, k, n, t_step, t_last):
+    def __init__(self, par, t, v, k, n, t_step, t_last, batched = False, cache = solution_cache, store_transient = True, early_stop = False,
+                 store = None, output_step : float = None, dtype = float):
         """Goodwill-Oscillator models
         dx/dt = v1 * K1^n/(K1^n+z^n) - v2 * x/(K2+x)
 
@@ -89,15 +340,105 @@ class Goodwin:
             t_last (int): because the system has to go through transient phase until it reachs his equilibrium. \n
                           So we need to remove the first part of the solution in order to see a stable plot.\n
                           We are only taking the last couple of for example 1000 timepoints in count.\n
+            batched (bool): solving bifurcation sweeps as one vectorized ensemble instead of one odeint call per v-value
+            cache (SolutionCache): memory for the solutions, so every integration only runs once. None turns it off
+            store_transient (bool): False only stores the last t_last / t_step timepoints of every solution.
+                                    The transient part still gets integrated, but the memory only grows with the kept window.
+            early_stop (bool): stopping the integration once the oscillation has settled on its limit cycle or fixed point
+                               (see odeint_until_converged). t is then only the maximal timespan, and only the kept window is stored.
+                               Batched sweeps ignore it, the ensemble runs over the whole timespan.
+            store (ResultStore): persistent store on disk that is asked before integrating (behind the cache), None keeps everything in memory
+            output_step (float): only storing every output_step hours (a multiple of t_step) instead of every t_step.
+                                 odeint keeps its own internal steps, so the accuracy does not change. t and t_step become the thinned out grid
+            dtype: dtype of the stored solutions, for example np.float32 or np.float16. The integration itself always runs in float64
         """
 
         self.par = par
-        self.t = t
+        self.t, self.stride = output_grid(t, output_step)
         self. v = v
         self.k = k
         self.n = n
-        self.t_step = t_step
+        self.t_step = t_step * self.stride
         self.t_last = t_last
+        self.batched = batched
+        self.cache = cache
+        self.store_transient = store_transient
+        self.early_stop = early_stop
+        self.store = store
+        self.dtype = np.dtype(dtype)
+
+
+    def cached(self, key, solve):
+        """
+        Looking up the solution in the cache and then in the store on disk before integrating. The normalizers, extrema and period methods
+        all go through the solvers, so a sweep gets only integrated once, no matter how many plots (or processes) use it.
+
+        Args:
+            key (tuple): everything that defines the integration, it gets hashed with hash_key
+            solve (callable): the integration itself
+
+        Returns:
+            the (read only) solution
+        """
+        if self.cache is None and self.store is None:
+            return solve()
+
+        digest = hash_key(*key)
+
+        if self.store is not None:
+            solve = partial(self.store.get_or_solve, digest, solve, model = key[0])
+
+        if self.cache is None:
+            return solve()
+
+        return self.cache.get_or_solve(digest, solve)
+
+
+    def integrate(self, func, par, args, **kwargs):
+        """
+        odeint over the timespan t. With store_transient = False only the kept window at the end gets stored.
+        The solution is stored as dtype.
+
+        Args:
+            func (callable): ODE function
+            par (list or array): initial values
+            args (tuple): other arguments of func
+            **kwargs: other odeint options (Dfun, ml, mu)
+
+        Returns:
+            array: solution for the whole timespan or only for the last t_last / t_step timepoints
+        """
+        t = self.t
+
+        if self.store_transient:
+            return odeint(func, par, t, args = args, **kwargs).astype(self.dtype, copy = False)
+
+        keep = int(self.t_last / self.t_step)
+
+        return odeint_window(func, par, t, keep, args = args, **kwargs).astype(self.dtype, copy = False)
+
+
+    def converged(self, func, par, args, **kwargs):
+        """
+        odeint that stops once the oscillation has settled (odeint_until_converged), cached like the other solvers.
+
+        Args:
+            func (callable): ODE function
+            par (list or array): initial values
+            args (tuple): other arguments of func
+            **kwargs: other odeint options (Dfun)
+
+        Returns:
+            tuple: (last t_last / t_step timepoints of the solution, time of the convergence or nan)
+        """
+        keep = int(self.t_last / self.t_step)
+        key = (func.__name__ + "_converged", par, self.t, *args, keep, self.dtype.str)
+
+        def solve():
+            window, t_converged = odeint_until_converged(func, par, self.t, keep, args = args, **kwargs)
+            return window.astype(self.dtype, copy = False), t_converged
+
+        return self.cached(key, solve)
 
 
     def goodwin_solver(self):
@@ -112,7 +453,40 @@ class Goodwin:
         k = self.k
         n = self.n
 
-        return odeint(goodwin, par, t, args= (v, k, n))
+        if self.early_stop:
+            return self.converged(goodwin, par, (v, k, n), Dfun = goodwin_jacobian)[0]
+
+        key = ("goodwin", par, t, v, k, n, self.store_transient, self.t_last / self.t_step, self.dtype.str)
+
+        return self.cached(key, lambda: self.integrate(goodwin, par, (v, k, n), Dfun = goodwin_jacobian))
+    
+
+    def goodwin_convergence_time(self):
+        """
+        Returns:
+            float: time [h] after which the oscillation has settled on its limit cycle or fixed point, nan if it did not settle in t
+        """
+        return self.converged(goodwin, self.par, (self.v, self.k, self.n), Dfun = goodwin_jacobian)[1]
+
+
+    def iter_solve(self, chunk : int = 100000, method : str = "LSODA"):
+        """
+        Streaming version of goodwin_solver. The solution is handed out in blocks of chunk timepoints while the solver
+        keeps running, so long runs (50000h) can be reduced, written to disk or plotted with bounded memory.
+
+        Args:
+            chunk (int): timepoints per block
+            method (str): solve_ivp method, "LSODA" like odeint
+
+        Yields:
+            tuple: (t_block, sol_block) -> timepoints and the (len(t_block), 3) solution
+        """
+        v = self.v
+        k = self.k
+        n = self.n
+
+        yield from iter_solve(lambda time, par: goodwin(par, time, v, k, n), self.t, self.par, chunk, method,
+                              jac = lambda time, par: goodwin_jacobian(par, time, v, k, n))
     
 
     def goodwin_normalizer(self):
@@ -135,16 +509,32 @@ class Goodwin:
         return norm
     
 
-    def goodwin_period(self, par_index : int):
+    def goodwin_events(self):
+        """
+        Maxima, minima and periods located during the integration (goodwin_event_point), without a dense output grid.
+
+        Returns:
+            ndarray: (3, 3) array -> [maxima, minima, periods] of the mean normalized x, y, z
+        """
+        key = ("goodwin_events", self.par, self.t[0], self.t[-1], self.v, self.k, self.n, self.t_last)
+
+        return self.cached(key, lambda: goodwin_event_point(self.v, self.par, self.t, self.k, self.n, self.t_last))
+
+
+    def goodwin_period(self, par_index : int, events : bool = False):
         """
         Getting Period T of the Goodwin-Oscillation.
 
         Args:
             par_index (int): index of the choosen system (x -> 0, y -> 1, z -> 2)
+            events (bool): locating the maxima with root finding on dx/dt = 0 during the integration (mean over all cycles of t_last)
 
         Returns:
             int: period of the oscillation
         """
+        if events:
+            return self.goodwin_events()[2][par_index]
+
         norm = self.goodwin_normalizer()[par_index]
         maxi = argrelmax(norm)[0]   # returning the index of the maximum
 
@@ -232,6 +622,51 @@ class Goodwin:
         return v_new
 
 
+    def goodwin_ensemble_solver(self, v):
+        """
+        Solving the Goodwin equations for many v-parameter sets in one single odeint call.
+        All members are stacked into one (M, 3) state, so the python overhead of the solver is paid only once.
+        Every member only depends on its own x, y, z, so the jacobian is block diagonal (bandwidth 2).
+        It is passed to odeint in banded form (ml/mu), which keeps the stiff steps as cheap as for a single run.
+
+        Args:
+            v (ndarray or list): (M, 6) v-parameter sets, one row for each member
+
+        Returns:
+            ndarray: (M, len(t), 3) solutions of every member (only the kept window with store_transient = False)
+        """
+        v = np.asarray(v, dtype = float)
+        par = np.tile(np.asarray(self.par, dtype = float), len(v))
+        k = self.k
+        n = self.n
+
+        sol = self.integrate(goodwin_vectorized, par, (v, k, n), Dfun = goodwin_vectorized_jacobian, ml = 2, mu = 2)
+
+        return np.moveaxis(sol.reshape(len(sol), len(v), 3), 1, 0)
+
+
+    def initial_ensemble_solver(self, par, method : str = "dopri5", rtol : float = 1e-6, atol : float = 1e-9, substeps : int = 1):
+        """
+        Solving the Goodwin equations for many initial values at once with the NumPy ensemble integrators.
+
+        Args:
+            par (ndarray): (M, 3) initial values x, y, z of every member
+            method (str): "dopri5" (adaptive step for every member) or "rk4" (fixed step, the steps of t)
+            rtol (float): relative tolerance of dopri5
+            atol (float): absolute tolerance of dopri5
+            substeps (int): rk4 steps between two timepoints of t (of the original timespan, before output_step thinned it out)
+
+        Returns:
+            ndarray: (len(t), M, 3) solution as dtype
+        """
+        args = (self.v, self.k, self.n)
+
+        if method == "rk4":
+            return rk4(goodwin_vectorized, par, self.t, args, substeps * self.stride).astype(self.dtype, copy = False)
+
+        return dopri5(goodwin_vectorized, par, self.t, args, rtol = rtol, atol = atol).astype(self.dtype, copy = False)
+
+
     def bifurcation_solver(self, v_start : float, v_end : float, v_step : float, v_index : int):
         """
         Args:
@@ -241,7 +676,7 @@ class Goodwin:
             v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
 
         Returns:
-            List: changing one v_parameters and solve the ODE (Goodwin)
+            List: changing one v_parameters and solve the ODE (Goodwin). With batched = True all v-values get solved together as one ensemble.
         """
         v = self.v_change(v_start, v_end, v_step, v_index)
         par = self.par
@@ -249,9 +684,241 @@ class Goodwin:
         k = self.k
         n = self.n
 
-        sol = [odeint(goodwin, par, t, args= (i, k, n)) for i in v]
+        key = ("goodwin_sweep", par, t, v, k, n, self.batched, self.store_transient, self.t_last / self.t_step, self.dtype.str)
+
+        if self.batched:
+            return list(self.cached(key, lambda: tuple(self.goodwin_ensemble_solver(v))))
+
+        if self.early_stop:
+            return [self.converged(goodwin, par, (i, k, n), Dfun = goodwin_jacobian)[0] for i in v]
 
-        return sol
+        sol = self.cached(key, lambda: tuple(self.integrate(goodwin, par, (i, k, n), Dfun = goodwin_jacobian) for i in v))
+
+        return list(sol)
+    
+
+    def bifurcation_convergence_times(self, v_start : float, v_end : float, v_step : float, v_index : int):
+        """
+        Args:
+            v_start (float): First value of the interval
+            v_end (float): Last value of the interval
+            v_step (float): Steps of the interval
+            v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
+
+        Returns:
+            List: time [h] after which every v-value has settled on its limit cycle or fixed point (nan if it did not settle in t)
+        """
+        v = self.v_change(v_start, v_end, v_step, v_index)
+
+        return [self.converged(goodwin, self.par, (i, self.k, self.n), Dfun = goodwin_jacobian)[1] for i in v]
+    
+
+    def bifurcation_events(self, v_start : float, v_end : float, v_step : float, v_index : int):
+        """
+        Args:
+            v_start (float): First value of the interval
+            v_end (float): Last value of the interval
+            v_step (float): Steps of the interval
+            v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
+
+        Returns:
+            List: (3, 3) array -> [maxima, minima, periods] of the mean normalized x, y, z for every v-value, located with events
+        """
+        v = self.v_change(v_start, v_end, v_step, v_index)
+        key = ("goodwin_sweep_events", self.par, self.t[0], self.t[-1], v, self.k, self.n, self.t_last)
+
+        return list(self.cached(key, lambda: tuple(goodwin_event_point(i, self.par, self.t, self.k, self.n, self.t_last) for i in v)))
+
+
+    def bifurcation_sweep(self, v_start : float, v_end : float, v_step : float, v_index : int, max_workers : int = None, chunksize : int = None,
+                          events : bool = False):
+        """
+        Parallel version of the bifurcation sweep. Every v-value gets solved in a worker process (ProcessPoolExecutor)
+        and only the extrema and periods are sent back, not the whole trajectories.
+
+        Args:
+            v_start (float): First value of the interval
+            v_end (float): Last value of the interval
+            v_step (float): Steps of the interval
+            v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
+            max_workers (int): numbers of worker processes, None takes all cores
+            chunksize (int): v-values per task, None chooses it by itself
+            events (bool): locating the extrema with root finding during the integration (goodwin_event_point)
+
+        Returns:
+            list: three lists -> maxima, minima and periods. Each entry contains the values for x, y, z
+        """
+        v = self.v_change(v_start, v_end, v_step, v_index)
+        executor = SweepExecutor(max_workers, chunksize)
+
+        if events:
+            sweep = executor.map(goodwin_event_point, v, par = self.par, t = self.t, k = self.k, n = self.n, t_last = self.t_last)
+        else:
+            sweep = executor.map(goodwin_sweep_point, v, par = self.par, t = self.t, k = self.k, n = self.n, t_step = self.t_step, t_last = self.t_last)
+
+        maxi = [list(i[0]) for i in sweep]
+        mini = [list(i[1]) for i in sweep]
+        period = [list(i[2]) for i in sweep]
+
+        return maxi, mini, period
+    
+
+    def bifurcation_warm_sweep(self, v_start : float, v_end : float, v_step : float, v_index : int, settle : float = 100, backward : bool = True):
+        """
+        Natural continuation of the sweep: every v-value starts from the final state of its neighbour instead of par,
+        so it only needs a short settle window before the last t_last hours get recorded (with events, like goodwin_event_point).
+        The backward pass goes through the v-values again from the end, starting from the last state of the forward pass.
+        Where both passes disagree, the system is bistable (hysteresis).
+
+        Args:
+            v_start (float): First value of the interval
+            v_end (float): Last value of the interval
+            v_step (float): Steps of the interval
+            v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
+            settle (float): hours that get integrated at every v-value before the recording starts.
+                            The first v-value of the forward pass gets the whole timespan t to remove the transient part
+            backward (bool): also running the backward pass
+
+        Returns:
+            tuple: forward and backward pass (None without backward). Both are three lists -> maxima, minima and periods in the order of
+                   the v-values, each entry contains the values for x, y, z
+        """
+        v = self.v_change(v_start, v_end, v_step, v_index)
+        k = self.k
+        n = self.n
+        t_last = self.t_last
+
+        def sweep(values, state, first):
+            reductions = []
+
+            for i, value in enumerate(values):
+                span = [0, first] if i == 0 and first else [0, settle + t_last]
+                events = solve_extrema(goodwin, state, span, span[-1] - t_last, args = (value, k, n), jac = goodwin_jacobian)
+                state = events["final"]
+                reductions.append(event_reduction(events))
+
+            return reductions, state
+
+        def passes():
+            forward, state = sweep(v, self.par, self.t[-1] - self.t[0])
+
+            if not backward:
+                return tuple(forward), None
+
+            return tuple(forward), tuple(sweep(v[::-1], state, None)[0][::-1])
+
+        key = ("goodwin_warm_sweep", self.par, self.t[0], self.t[-1], v, k, n, t_last, settle, backward)
+        forward, reverse = self.cached(key, passes)
+
+        split = lambda sweep: ([list(i[0]) for i in sweep], [list(i[1]) for i in sweep], [list(i[2]) for i in sweep])
+
+        return split(forward), (split(reverse) if reverse is not None else None)
+    
+
+    def bifurkation_hysteresis_plot(self, v_start : float, v_end : float, v_step : float, v_index : int, par_index : int, settle : float = 100):
+        """
+        Plotting the forward (green) and backward (red, dashed) pass of bifurcation_warm_sweep over each other.
+
+        Args:
+            v_start (float): First value of the interval
+            v_end (float): Last value of the interval
+            v_step (float): Steps of the interval
+            v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
+            par_index (int): Position of the System-value that we want to plot (x -> 0, y -> 1, z -> 2)
+            settle (float): hours that get integrated at every v-value before the recording starts
+        """
+        forward, reverse = self.bifurcation_warm_sweep(v_start, v_end, v_step, v_index, settle)
+        v_look = np.arange(v_start, v_end, v_step)
+        v = ["v$_1$", "v$_2$", "v$_3$", "v$_4$", "v$_5$", "v$_6$", "v$_7$"]
+        name = ["x", "y", "z"][par_index]
+
+        for extrema in forward[:2]:
+            plt.plot(v_look, np.array(extrema)[:, par_index], 'g')
+        for extrema in reverse[:2]:
+            plt.plot(v_look, np.array(extrema)[:, par_index], 'r--')
+
+        plt.ylabel(name + '$_{min}$, ' + name + '$_{max}$')
+        plt.xlim(0, v_end)
+        plt.xlabel(name + " rate by changing " + v[v_index])
+        plt.show()
+
+        return None
+    
+
+    def bifurcation_adaptive(self, v_start : float, v_end : float, v_index : int, budget : int = 200, initial : int = 17,
+                             threshold : float = 0.05, max_workers : int = None, chunksize : int = None):
+        """
+        Adaptive version of bifurcation_sweep (with events). The sweep starts on a coarse grid and only refines the intervals where the
+        extrema or the period change by more than threshold, or where the oscillation starts or dies (the period turns into nan).
+
+        Args:
+            v_start (float): First value of the interval
+            v_end (float): Last value of the interval (it is included)
+            v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
+            budget (int): total numbers of solves
+            initial (int): numbers of v-values of the coarse grid
+            threshold (float): largest relative change between two neighbouring v-values that is not refined
+            max_workers (int): numbers of worker processes, None takes all cores
+            chunksize (int): v-values per task, None chooses it by itself
+
+        Returns:
+            Array, list: the v-values and three lists -> maxima, minima and periods. Each entry contains the values for x, y, z
+        """
+        executor = SweepExecutor(max_workers, chunksize)
+
+        values, sweep = executor.refine(goodwin_value_point, v_start, v_end, budget, initial, threshold, v = list(self.v), v_index = v_index,
+                                        par = self.par, t = self.t, k = self.k, n = self.n, t_last = self.t_last)
+
+        return values, [list(i[0]) for i in sweep], [list(i[1]) for i in sweep], [list(i[2]) for i in sweep]
+    
+
+    def heatmap(self, x_name : str, x_values, y_name : str, y_values, path : str, tile : int = 16, max_workers : int = None):
+        """
+        Two parameter sweep, for example over (v2, n) or (v1, k1). The grid is solved in tiles on all cores, and every finished tile
+        is written to path right away (see SweepExecutor.grid), so an interrupted sweep continues where it stopped.
+
+        Args:
+            x_name (str): first parameter ("v1" ... "v6", "k1", "k2", "k4", "k6", "n")
+            x_values (list or array): values of the first parameter
+            y_name (str): second parameter
+            y_values (list or array): values of the second parameter
+            path (str): folder of the results
+            tile (int): edge length of the tiles
+            max_workers (int): numbers of worker processes, None takes all cores
+
+        Returns:
+            Array: memory mapped (len(y_values), len(x_values), 3, 3) array -> [maxima, minima, periods] of the mean normalized x, y, z
+                   for every grid point. maxima - minima is the amplitude, the period is nan where the system does not oscillate
+        """
+        executor = SweepExecutor(max_workers)
+
+        return executor.grid(goodwin_grid_point, x_values, y_values, path, fields = (3, 3), tile = tile, x_name = x_name, y_name = y_name,
+                             v = list(self.v), k = list(self.k), n = self.n, par = self.par, t = self.t, t_last = self.t_last)
+    
+
+    def heatmap_plot(self, x_name : str, x_values, y_name : str, y_values, path : str, par_index : int, tile : int = 16, max_workers : int = None):
+        """
+        Plotting the period and the amplitude of the two parameter sweep next to each other.
+
+        Args:
+            par_index (int): Position of the System-value that we want to plot (x -> 0, y -> 1, z -> 2)
+            the other arguments are the ones of heatmap
+        """
+        grid = self.heatmap(x_name, x_values, y_name, y_values, path, tile, max_workers)
+        name = ["x", "y", "z"][par_index]
+
+        figure, axes = plt.subplots(1, 2, figsize = (12, 5))
+
+        for axis, values, label in zip(axes, (grid[:, :, 2, par_index], grid[:, :, 0, par_index] - grid[:, :, 1, par_index]),
+                                       ("Period [h]", name + "$_{max}$ - " + name + "$_{min}$")):
+            mesh = axis.pcolormesh(x_values, y_values, values, shading = "auto")
+            figure.colorbar(mesh, ax = axis, label = label)
+            axis.set_xlabel(x_name)
+            axis.set_ylabel(y_name)
+
+        plt.show()
+
+        return None
     
 
     def bifurcation_normalizer(self, v_start : float, v_end : float, v_step : float, v_index : int):
@@ -317,17 +984,22 @@ class Goodwin:
         return None
     
 
-    def bifurcation_extrema(self,  v_start : float, v_end : float, v_step : float, v_index : int):
+    def bifurcation_extrema(self,  v_start : float, v_end : float, v_step : float, v_index : int, events : bool = False):
         """
         Args:
             v_start (float): First value of the interval
             v_end (float): Last value of the interval
             v_step (float): Steps of the interval
             v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
+            events (bool): locating the extrema with root finding on dx/dt = 0 during the integration
 
         Returns:
             list: returning two lists. first one contains all Maxima from the Goodwin-Oscillation and the second one all Minima from the Goodwin-Oscillation
         """
+        if events:
+            sweep = self.bifurcation_events(v_start, v_end, v_step, v_index)
+            return [list(i[0]) for i in sweep], [list(i[1]) for i in sweep]
+
         norm = self.bifurcation_normalizer(v_start, v_end, v_step, v_index)
         par = self.par
 
@@ -413,7 +1085,7 @@ class Goodwin:
         return None
     
 
-    def bifurkation_period(self, v_start : float, v_end : float, v_step : float, v_index : int, par_index : int):
+    def bifurkation_period(self, v_start : float, v_end : float, v_step : float, v_index : int, par_index : int, events : bool = False):
         """
         Args:
             v_start (float): First value of the interval
@@ -421,10 +1093,14 @@ class Goodwin:
             v_step (float): Steps of the interval
             v_index (int): Position of the v-value that will be changed (v1 -> 0, v2 -> 1, v3 -> 2, v4 -> 3, v5 -> 4, v6 -> 5)
             par_index (int): Position of the System-value that we want to plot (x -> 0, y -> 1, z -> 2)
+            events (bool): locating the maxima with root finding on dx/dt = 0 during the integration, accurate far below t_step
 
         Returns:
             List: Periods for choosen systemparameters and choosen parameter that get changed. We are getting the mean of the distance, because the dinamic of this oscillator is nonlinear
         """
+        if events:
+            return [i[2][par_index] for i in self.bifurcation_events(v_start, v_end, v_step, v_index)]
+
         maxi_index = self.bifurcation_maxima_index(v_start, v_end,v_step, v_index)
 
         t_last = self.t_last
@@ -474,7 +1150,12 @@ class Goodwin:
         k = self.k
         n = self.n
         
-        return odeint(goodwin_with_positive_loop, par, t, args=(v, k , n, c))
+        if self.early_stop:
+            return self.converged(goodwin_with_positive_loop, par, (v, k, n, c), Dfun = goodwin_with_positive_loop_jacobian)[0]
+
+        key = ("goodwin_with_positive_loop", par, t, v, k, n, c, self.store_transient, self.t_last / self.t_step, self.dtype.str)
+
+        return self.cached(key, lambda: self.integrate(goodwin_with_positive_loop, par, (v, k , n, c), Dfun = goodwin_with_positive_loop_jacobian))
     
     def goodwin_positive_feedback_normalizier(self, c : int):
         sol = self.goodwin_positive_feedback(c)
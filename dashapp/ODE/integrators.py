@@ -0,0 +1,543 @@
+"""
+Ensemble integrators written in NumPy.
+
+scipy's odeint only takes one 1D state vector. These integrators advance a whole (M, dim) block of states at once,
+for example thousands of Duffing or Goodwin trajectories with different initial conditions.
+The ODE functions have the same form as for odeint, func(par, t, *args), but par is the (M, dim) block
+(see goodwin_vectorized, duffing_vectorized and coupled_oscillator_vectorized).
+
+There are also a couple of helpers around scipy's solvers, for example output_grid that thins out the stored timepoints,
+odeint_window that does not store the transient part, odeint_until_converged that stops once the oscillator has settled,
+solve_extrema that finds the extrema with events and iter_solve that hands out the solution in blocks.
+"""
+
+import numpy as np
+from scipy.integrate import odeint, LSODA, BDF, Radau, RK45, DOP853
+from scipy.optimize import brentq
+from scipy.signal import find_peaks
+
+
+# [Dormand-Prince 5(4)]__________________________________________________________________________________________________________________________
+
+C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+
+A = [
+    [],
+    [1/5],
+    [3/40, 9/40],
+    [44/45, -56/15, 32/9],
+    [19372/6561, -25360/2187, 64448/6561, -212/729],
+    [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+]
+
+B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+
+E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])   # 5th order - 4th order solution
+
+P = np.array([                                                                   # dense output (Shampine), same as scipy's RK45
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423],
+])
+
+
+# [Helper]_______________________________________________________________________________________________________________________________________
+
+def member_arguments(args, members, index):
+    """
+    Only the arguments of the active members. Arguments at the positions in members have one row for every
+    member (for example a (M, 6) v-array) and get sliced, all others are shared by the whole ensemble.
+
+    Args:
+        args (tuple): arguments of the ODE function
+        members (tuple): positions of the per member arguments in args
+        index (array): indices of the active members
+
+    Returns:
+        tuple: arguments for the active members
+    """
+    return tuple(np.asarray(arg)[index] if i in members else arg for i, arg in enumerate(args))
+
+
+# [odeint]_______________________________________________________________________________________________________________________________________
+
+def output_grid(t, step : float = None):
+    """
+    Thinning out the output grid of a timespan, for example only every 0.5h of a timespan with 0.01h steps.
+    odeint and the solve_ivp solvers choose their internal steps by rtol/atol and only interpolate onto the output grid,
+    so the accuracy stays the same, only fewer timepoints get stored.
+
+    Args:
+        t (array): timespan
+        step (float): distance of the stored timepoints, rounded to a multiple of the steps of t. None keeps t
+
+    Returns:
+        tuple: (t[::stride], stride)
+    """
+    if step is None or len(t) < 2:
+        return t, 1
+
+    stride = max(int(round(step / (t[1] - t[0]))), 1)
+
+    return t[::stride], stride
+
+
+def odeint_window(func, y0, t, keep : int, args = (), **kwargs):
+    """
+    odeint, but only the last keep timepoints of t are stored.
+    The transient part gets integrated in one go without any output, and only the window at the end is allocated.
+    odeint restarts at t[-keep], so the step history differs from a full odeint run and the window only agrees with its sol[-keep:]
+    within the tolerances (rtol, atol), not bit for bit.
+
+    Args:
+        func (callable): ODE function func(par, t, *args)
+        y0 (list or array): initial values
+        t (array): timespan
+        keep (int): last couple of timepoints that get stored
+        args (tuple): other arguments of func
+        **kwargs: other odeint options (Dfun, ml, mu, rtol, ...)
+
+    Returns:
+        array: (keep, len(y0)) solution at t[-keep:]
+
+    Raises:
+        ValueError: if keep is smaller than 1
+    """
+    if keep < 1:
+        raise ValueError(f"keep has to be at least 1, got {keep}")
+
+    start = max(len(t) - keep, 0)
+
+    if start > 0:
+        # without output points in between odeint needs more internal steps per call than the default 500
+        y0 = odeint(func, y0, [t[0], t[start]], args = args, mxstep = 10 * start + 500, **kwargs)[-1]
+
+    return odeint(func, y0, t[start:], args = args, **kwargs)
+
+
+def odeint_until_converged(func, y0, t, keep : int, args = (), index : int = 0, rtol : float = 1e-3, atol : float = 1e-6,
+                           cycles : int = 3, chunk : int = None, **kwargs):
+    """
+    odeint in chunks that stops as soon as the oscillator has settled. After every chunk the maxima and minima of
+    y[index] are collected. The run counts as converged if the last cycles maxima, minima and periods agree within rtol
+    (limit cycle), or if the state has stopped moving, max|dy/dt| < atol (fixed point).
+    Close to a Hopf bifurcation the amplitude decays (or grows) so slowly that a couple of successive cycles agree long before
+    the limit cycle is reached. So the mean extrema of successive chunks are compared too: their drift, and the rest of the drift
+    that is still to come if it keeps decaying geometrically from chunk to chunk, have to be within rtol as well
+    (drifts below the spread of the cycles are only the jitter of the output grid and are not extrapolated).
+    After that only one more window of keep timepoints is integrated, so a run that settles after 2000h does not go on to 50000h.
+
+    Args:
+        func (callable): ODE function func(par, t, *args)
+        y0 (list or array): initial values
+        t (array): timespan, the maximal integration time
+        keep (int): last couple of timepoints that get returned
+        args (tuple): other arguments of func
+        index (int): variable that is checked for the extrema
+        rtol (float): relative tolerance of the maxima, minima and periods
+        atol (float): a state with max|dy/dt| below atol has stopped moving
+        cycles (int): numbers of successive cycles that have to agree
+        chunk (int): timepoints per odeint call, None takes keep
+        **kwargs: other odeint options (Dfun, ...)
+
+    Returns:
+        array, float: (keep, len(y0)) solution after the convergence and the time of the convergence (nan if it did not converge in t)
+    """
+    chunk = max(chunk or keep, 2)
+    state = np.asarray(y0, dtype = float)
+    window = state[None, :]
+    maxima = []
+    minima = []
+    maxima_t = []
+    before = []         # last but one timepoint of the previous chunk, the extrema at the chunk borders need it
+    levels = []         # mean of the last cycles maxima and minima after every chunk, as long as they are settled
+    spreads = []        # ptp of these cycles, below that a drift is only the jitter of the output grid
+
+    settled = lambda values: len(values) >= cycles and np.ptp(values[-cycles:]) <= rtol * max(abs(np.mean(values[-cycles:])), atol)
+
+    def drifting():
+        """True if the extrema still move from chunk to chunk, or would still move by more than rtol in the chunks to come"""
+        if len(levels) < 2:
+            return True
+
+        drift = levels[-1] - levels[-2]
+        rest = np.abs(drift)
+
+        if len(levels) >= 3:
+            with np.errstate(divide = "ignore", invalid = "ignore"):
+                ratio = drift / (levels[-2] - levels[-3])
+
+            decaying = (ratio > 0) & (ratio < 1) & (np.abs(drift) > spreads[-1])
+            rest[decaying] = rest[decaying] / (1 - ratio[decaying])    # geometric series of the drifts that are still to come
+
+        return np.any(rest > rtol * np.maximum(np.abs(levels[-1]), atol))
+
+    i = 0
+    while i < len(t) - 1:
+        j = min(i + chunk, len(t) - 1)
+        block = odeint(func, state, t[i : j + 1], args = args, **kwargs)
+        state = block[-1]
+        window = np.concatenate((window, block[1:]))[-keep:]
+
+        series = np.concatenate((before, block[:, index]))
+        times = np.concatenate((t[i - len(before) : i], t[i : j + 1]))
+        peaks = find_peaks(series)[0]
+        valleys = find_peaks(- series)[0]
+        maxima.extend(series[peaks])
+        maxima_t.extend(times[peaks])
+        minima.extend(series[valleys])
+        before = block[-2:-1, index]
+
+        i = j
+
+        if settled(maxima) and settled(minima):
+            levels.append(np.array([np.mean(maxima[-cycles:]), np.mean(minima[-cycles:])]))
+            spreads.append(np.array([np.ptp(maxima[-cycles:]), np.ptp(minima[-cycles:])]))
+        else:
+            levels.clear()
+            spreads.clear()
+
+        limit_cycle = settled(list(np.diff(maxima_t))) and not drifting()
+        fixed_point = np.max(np.abs(func(state, t[i], *args))) < atol
+
+        if limit_cycle or fixed_point:
+            t_converged = t[i]
+            end = min(i + keep, len(t) - 1)
+
+            if end > i:
+                window = np.concatenate((window, odeint(func, state, t[i : end + 1], args = args, **kwargs)[1:]))[-keep:]
+
+            return window, t_converged
+
+    return window, np.nan
+
+
+# [Events]_______________________________________________________________________________________________________________________________________
+
+def solve_extrema(func, y0, t, t_start : float, args = (), jac = None, method : str = "LSODA", rtol : float = 1e-8, atol : float = 1e-10,
+                  slope_tol : float = 1e-8):
+    """
+    Maxima and minima of every component, located during the integration as roots of dy_i/dt = 0.
+    After every step of the solver the signs of dy/dt are compared, and a sign change is refined with brentq on the dense interpolant
+    of that step, so the times are much more accurate than t_step and no output grid is needed at all.
+    Sign changes where |dy_i/dt| stays below slope_tol are only numerical noise around a fixed point and are skipped.
+    The transient part up to t_start gets integrated in one odeint call without output.
+    The mean of every component is integrated along with the solution (dI/dt = y), for the normalization. Besides the mean over
+    [t_start, t[-1]] there is also the mean over whole cycles (first to last maximum), which does not depend on where the window ends.
+
+    Args:
+        func (callable): ODE function func(par, t, *args) like for odeint
+        y0 (list or array): initial values
+        t (array): timespan, only t[0] and t[-1] are used
+        t_start (float): time where the extrema start to be recorded (end of the transient part)
+        args (tuple): other arguments of func
+        jac (callable): Jacobian jac(par, t, *args) like the Dfun of odeint
+        method (str): "LSODA", "BDF", "Radau", "RK45" or "DOP853"
+        rtol (float): relative tolerance
+        atol (float): absolute tolerance
+        slope_tol (float): smallest |dy/dt| that counts as an extremum
+
+    Returns:
+        dict: "maxima_t", "maxima", "minima_t", "minima" -> lists with one array per component, "mean" -> mean of every component,
+              "cycle_mean" -> mean over whole cycles (the window mean if there are less than two maxima) and "final" -> state at t[-1]
+
+    Raises:
+        RuntimeError: if the solver fails
+    """
+    y0 = np.asarray(y0, dtype = float)
+    dim = len(y0)
+
+    if t_start > t[0]:
+        y0 = odeint(func, y0, [t[0], t_start], args = args, Dfun = jac, rtol = rtol, atol = atol, mxstep = 10**7)[-1]
+
+    duration = t[-1] - t_start
+
+    if duration <= 0:
+        empty = [np.empty(0) for i in range(dim)]
+        return {"maxima_t": empty, "maxima": empty, "minima_t": empty, "minima": empty, "mean": y0, "cycle_mean": y0, "final": y0}
+
+    def fun(time, y):
+        return np.concatenate((func(y[:dim], time, *args), y[:dim]))
+
+    options = {}
+    if jac is not None:
+        def jacobian(time, y):
+            full = np.zeros((2 * dim, 2 * dim))
+            full[:dim, :dim] = jac(y[:dim], time, *args)
+            full[dim:, :dim] = np.eye(dim)
+            return full
+
+        options["jac"] = jacobian
+
+    solver = solvers[method](fun, t_start, np.concatenate((y0, np.zeros(dim))), t[-1], rtol = rtol, atol = atol, **options)
+
+    extrema = {"maxima_t": [[] for i in range(dim)], "maxima": [[] for i in range(dim)],
+               "minima_t": [[] for i in range(dim)], "minima": [[] for i in range(dim)]}
+    integral = [[] for i in range(dim)]     # integral of y_i at its maxima
+    slope = np.asarray(func(y0, t_start, *args), dtype = float)
+
+    while solver.status == "running":
+        t_old = solver.t
+        solver.step()
+
+        if solver.status == "failed":
+            raise RuntimeError(solver.message)
+
+        new_slope = np.asarray(func(solver.y[:dim], solver.t, *args), dtype = float)
+        changed = (np.sign(slope) != np.sign(new_slope)) & (np.maximum(np.abs(slope), np.abs(new_slope)) > slope_tol)
+
+        if changed.any():
+            interpolant = solver.dense_output()
+
+            for i in np.flatnonzero(changed):
+                try:
+                    root = brentq(lambda time: func(interpolant(time)[:dim], time, *args)[i], t_old, solver.t, xtol = 1e-12)
+                except ValueError:      # the interpolant does not cross zero itself
+                    continue
+
+                kind = "maxima" if slope[i] > 0 else "minima"
+                extrema[kind + "_t"][i].append(root)
+                extrema[kind][i].append(interpolant(root)[i])
+
+                if kind == "maxima":
+                    integral[i].append(interpolant(root)[dim + i])
+
+        slope = new_slope
+
+    events = {name : [np.array(i) for i in values] for name, values in extrema.items()}
+    events["mean"] = solver.y[dim:] / duration
+    events["cycle_mean"] = np.array([(integral[i][-1] - integral[i][0]) / (extrema["maxima_t"][i][-1] - extrema["maxima_t"][i][0])
+                                     if len(integral[i]) > 1 else events["mean"][i] for i in range(dim)])
+    events["final"] = solver.y[:dim]
+
+    return events
+
+
+# [Streaming]____________________________________________________________________________________________________________________________________
+
+solvers = {"LSODA" : LSODA, "BDF" : BDF, "Radau" : Radau, "RK45" : RK45, "DOP853" : DOP853}
+
+
+def iter_solve(fun, t, y0, chunk : int, method : str = "LSODA", jac = None, **options):
+    """
+    Integrating over the timespan t and handing out the solution in blocks of chunk timepoints.
+    One scipy solver object runs through the whole timespan, so its state (step size, history...) is carried
+    from one block to the next, and the timepoints come from its dense output.
+    Only one block is in memory at a time, as long as the consumer does not keep them.
+
+    Args:
+        fun (callable): ODE function in solve_ivp order fun(t, y)
+        t (array): timespan
+        y0 (list or array): initial values
+        chunk (int): timepoints per block
+        method (str): "LSODA", "BDF", "Radau", "RK45" or "DOP853"
+        jac (callable or matrix): Jacobian jac(t, y) in solve_ivp order
+        **options: other options of the solver (rtol, atol, ...). Default tolerances are the ones of odeint
+
+    Yields:
+        tuple: (t_block, sol_block) -> timepoints and the (len(t_block), len(y0)) solution at them
+
+    Raises:
+        RuntimeError: if the solver fails
+    """
+    t = np.asarray(t, dtype = float)
+    y0 = np.asarray(y0, dtype = float)
+    options.setdefault("rtol", 1.49012e-8)
+    options.setdefault("atol", 1.49012e-8)
+
+    if jac is not None:
+        options["jac"] = jac
+
+    solver = solvers[method](fun, t[0], y0, t[-1], **options)
+
+    block = np.empty((min(chunk, len(t)), len(y0)))
+    block[0] = y0
+    start = 0       # index of t where the current block starts
+    filled = 1      # timepoints in the current block
+    i = 1           # next index of t
+
+    while i < len(t):
+        solver.step()
+
+        if solver.status == "failed":
+            raise RuntimeError(solver.message)
+
+        j = np.searchsorted(t, solver.t, side = "right") if solver.status == "running" else len(t)
+
+        if j > i:
+            values = solver.dense_output()(t[i:j]).T
+
+            while len(values):
+                take = min(len(values), len(block) - filled)
+                block[filled : filled + take] = values[:take]
+                filled += take
+                values = values[take:]
+
+                if filled == len(block):
+                    yield t[start : start + filled], block
+
+                    start += filled
+                    block = np.empty((min(chunk, len(t) - start), len(y0)))
+                    filled = 0
+
+            i = j
+
+    if filled:
+        yield t[start : start + filled], block[:filled]
+
+
+# [RK4]__________________________________________________________________________________________________________________________________________
+
+def rk4(func, y0, t, args = (), substeps : int = 1):
+    """
+    Classic Runge-Kutta 4 with a fixed step for a whole ensemble.
+    The step is the distance between two timepoints of t, divided into substeps.
+
+    Args:
+        func (callable): vectorized ODE function func(par, t, *args) with par as (M, dim) block
+        y0 (array): (M, dim) initial values of all members
+        t (array): timespan, the solution is returned at these timepoints
+        args (tuple): other arguments of func
+        substeps (int): rk4 steps between two timepoints of t
+
+    Returns:
+        array: (len(t), M, dim) solution
+    """
+    y = np.array(y0, dtype = float)
+    sol = np.empty((len(t),) + y.shape)
+    sol[0] = y
+
+    for i in range(len(t) - 1):
+        h = (t[i + 1] - t[i]) / substeps
+        ti = t[i]
+
+        for _ in range(substeps):
+            k1 = func(y, ti, *args)
+            k2 = func(y + h/2 * k1, ti + h/2, *args)
+            k3 = func(y + h/2 * k2, ti + h/2, *args)
+            k4 = func(y + h * k3, ti + h, *args)
+
+            y = y + h/6 * (k1 + 2 * k2 + 2 * k3 + k4)
+            ti = ti + h
+
+        sol[i + 1] = y
+
+    return sol
+
+
+# [DOPRI5]_______________________________________________________________________________________________________________________________________
+
+def initial_step(func, y, t0, f0, args, rtol, atol):
+    """rough first step of every member (Hairer, Solving ODEs I, p. 169), like scipy does it"""
+    scale = atol + np.abs(y) * rtol
+    d0 = np.sqrt(np.mean((y / scale)**2, axis = -1))
+    d1 = np.sqrt(np.mean((f0 / scale)**2, axis = -1))
+    h0 = np.where((d0 < 1e-5) | (d1 < 1e-5), 1e-6, 0.01 * d0 / np.where(d1 > 0, d1, 1))
+
+    f1 = func(y + h0[:, None] * f0, t0 + h0, *args)
+    d2 = np.sqrt(np.mean(((f1 - f0) / scale)**2, axis = -1)) / h0
+
+    h1 = np.where((d1 <= 1e-15) & (d2 <= 1e-15), np.maximum(1e-6, h0 * 1e-3), (0.01 / np.maximum(np.maximum(d1, d2), 1e-300))**(1/5))
+
+    return np.minimum(100 * h0, h1)
+
+
+def dopri5(func, y0, t, args = (), members = (), rtol : float = 1e-6, atol : float = 1e-9, max_steps : int = 1000000):
+    """
+    Adaptive Dormand-Prince 5(4) for a whole ensemble. Every member has its own time and step size,
+    so a member in a quiet part of its trajectory makes big steps while another one makes small ones.
+    Members that reached the end of t are masked out and cost nothing anymore.
+    The solution at the timepoints of t comes from the dense output of the method, so t does not limit the steps.
+
+    Args:
+        func (callable): vectorized ODE function func(par, t, *args) with par as (M, dim) block
+        y0 (array): (M, dim) initial values of all members
+        t (array): timespan, the solution is returned at these timepoints
+        args (tuple): other arguments of func
+        members (tuple): positions of the arguments in args that have one row per member (get sliced with the active members)
+        rtol (float): relative tolerance
+        atol (float): absolute tolerance
+        max_steps (int): maximum numbers of steps for every member
+
+    Returns:
+        array: (len(t), M, dim) solution
+
+    Raises:
+        RuntimeError: if a member needs more than max_steps steps
+    """
+    t = np.asarray(t, dtype = float)
+    y = np.array(y0, dtype = float)
+    M = len(y)
+
+    sol = np.empty((len(t),) + y.shape)
+    sol[0] = y
+
+    tm = np.full(M, t[0])
+    f = func(y, tm, *args)
+    h = initial_step(func, y, tm, f, args, rtol, atol)
+    next_out = np.ones(M, dtype = int)          # index of the next timepoint of t that every member has to fill
+    steps = np.zeros(M, dtype = int)
+
+    active = np.flatnonzero(next_out < len(t))
+
+    while len(active):
+        if np.any(steps[active] > max_steps):
+            raise RuntimeError("dopri5: a member needed more than max_steps steps")
+
+        ya = y[active]
+        ta = tm[active]
+        ha = np.minimum(h[active], t[-1] - ta)[:, None]
+        arg = member_arguments(args, members, active)
+
+        K = np.empty((7,) + ya.shape)
+        K[0] = f[active]
+
+        for s in range(1, 6):
+            dy = sum(A[s][j] * K[j] for j in range(s))
+            K[s] = func(ya + ha * dy, ta + C[s] * ha[:, 0], *arg)
+
+        y_new = ya + ha * np.tensordot(B, K[:6], axes = 1)
+        K[6] = func(y_new, ta + ha[:, 0], *arg)
+
+        scale = atol + np.maximum(np.abs(ya), np.abs(y_new)) * rtol
+        error = np.sqrt(np.mean((ha * np.tensordot(E, K, axes = 1) / scale)**2, axis = -1))
+
+        accepted = error <= 1
+        factor = np.clip(0.9 * np.where(error > 0, error, 1e-10)**(-1/5), 0.2, 10)
+        factor = np.where(accepted, factor, np.minimum(factor, 1))
+
+        steps[active] += 1
+        h[active] = ha[:, 0] * factor
+
+        # dense output for every timepoint of t inside the accepted steps
+        Q = np.einsum("smd,sp->pmd", K, P)     # (4, m, dim)
+        t_new = ta + ha[:, 0]
+        acc = np.flatnonzero(accepted)
+
+        while len(acc):
+            out = next_out[active[acc]]
+            inside = out < len(t)
+            inside[inside] = t[out[inside]] <= t_new[acc[inside]] + 1e-12 * np.maximum(1, np.abs(t_new[acc[inside]]))
+            acc = acc[inside]
+
+            if len(acc):
+                member = active[acc]
+                out = next_out[member]
+                theta = (t[out] - ta[acc]) / ha[acc, 0]
+                powers = np.stack([theta, theta**2, theta**3, theta**4])
+                sol[out, member] = ya[acc] + ha[acc] * np.einsum("pmd,pm->md", Q[:, acc], powers)
+                next_out[member] += 1
+
+        accepted = np.flatnonzero(accepted)
+        member = active[accepted]
+        y[member] = y_new[accepted]
+        tm[member] = t_new[accepted]
+        f[member] = K[6][accepted]
+
+        active = np.flatnonzero(next_out < len(t))
+
+    return sol
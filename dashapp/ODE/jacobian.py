@@ -0,0 +1,123 @@
+import numpy as np
+
+
+# [Finite differences]___________________________________________________________________________________________________________________________
+
+def finite_difference_jacobian(func, par, t, args = (), eps : float = 1e-7):
+    """
+    Jacobian of an ODE function with central differences. Only meant for checking the analytic Jacobians.
+
+    Args:
+        func (callable): ODE function func(par, t, *args) like the ones we give odeint
+        par (list or array): state where the Jacobian is evaluated
+        t (float): time
+        args (tuple): other arguments of func
+        eps (float): relative step of the differences
+
+    Returns:
+        array: (len(par), len(par)) Jacobian, J[i, j] = d(f_i)/d(par_j)
+    """
+    par = np.asarray(par, dtype = float)
+    jac = np.zeros((par.size, par.size))
+
+    for j in range(par.size):
+        h = eps * max(1, abs(par[j]))
+        up = par.copy()
+        down = par.copy()
+        up[j] += h
+        down[j] -= h
+
+        jac[:, j] = (np.asarray(func(up, t, *args), dtype = float) - np.asarray(func(down, t, *args), dtype = float)) / (2 * h)
+
+    return jac
+
+
+def unband(jac, ml : int, mu : int):
+    """
+    Turning a banded Jacobian of odeint (jac[i - j + mu, j] = d(f_i)/d(par_j)) back into the full matrix.
+
+    Args:
+        jac (array): (ml + mu + 1, N) banded Jacobian
+        ml (int): lower bandwidth
+        mu (int): upper bandwidth
+
+    Returns:
+        array: (N, N) Jacobian
+    """
+    size = jac.shape[1]
+    full = np.zeros((size, size))
+
+    for i in range(size):
+        for j in range(max(0, i - ml), min(size, i + mu + 1)):
+            full[i, j] = jac[i - j + mu, j]
+
+    return full
+
+
+def check_jacobian(func, jacobian, par, t, args = (), eps : float = 1e-7):
+    """
+    Consistency check of an analytic Jacobian against finite differences.
+
+    Args:
+        func (callable): ODE function func(par, t, *args)
+        jacobian (callable): analytic Jacobian jacobian(par, t, *args)
+        par (list or array): state where both get compared
+        t (float): time
+        args (tuple): other arguments of func
+        eps (float): relative step of the differences
+
+    Returns:
+        float: largest difference between both Jacobians, relative to the largest entry
+    """
+    analytic = np.asarray(jacobian(np.asarray(par, dtype = float), t, *args), dtype = float)
+    numeric = finite_difference_jacobian(func, par, t, args, eps)
+
+    return np.max(np.abs(analytic - numeric)) / max(1, np.max(np.abs(numeric)))
+
+
+def check_builtin_jacobians(tol : float = 1e-5, seed : int = 0):
+    """
+    Checking all built-in Jacobians (goodwin, goodwin_with_positive_loop, goodwin_vectorized, duffing, coupled_oscillator,
+    coupled_oscillator_meanfield)
+    at random states against finite differences.
+
+    Args:
+        tol (float): allowed relative difference
+        seed (int): seed of the random states
+
+    Returns:
+        dict: relative difference for every model
+
+    Raises:
+        AssertionError: if one of the Jacobians is off by more than tol
+    """
+    from .goodwin import goodwin, goodwin_jacobian, goodwin_with_positive_loop, goodwin_with_positive_loop_jacobian
+    from .goodwin import goodwin_vectorized, goodwin_vectorized_jacobian
+    from .duffing_poincare import duffing, duffing_jacobian
+    from .clock_interaction import coupled_oscillator, coupled_oscillator_jacobian
+    from .clock_interaction import coupled_oscillator_meanfield, coupled_oscillator_meanfield_jacobian
+
+    rng = np.random.default_rng(seed)
+    v = [0.7, 0.45, 0.7, 0.35, 0.7, 0.35]
+    k = [1, 1, 1, 1]
+    n = 5
+    period = rng.normal(24, 1.5, size = n)
+
+    v_ensemble = rng.uniform(0.1, 1.5, size = (4, 6))
+    ensemble_par = rng.uniform(0.1, 2, 12)
+
+    errors = {
+        "goodwin": check_jacobian(goodwin, goodwin_jacobian, rng.uniform(0.1, 2, 3), 0, (v, k, 7)),
+        "goodwin_with_positive_loop": check_jacobian(goodwin_with_positive_loop, goodwin_with_positive_loop_jacobian, rng.uniform(0.1, 2, 3), 0, (v, k, 7, 1)),
+        "goodwin_vectorized": check_jacobian(goodwin_vectorized, lambda *a: unband(goodwin_vectorized_jacobian(*a), 2, 2), ensemble_par, 0, (v_ensemble, k, 7)),
+        "duffing": check_jacobian(duffing, duffing_jacobian, rng.uniform(-2, 2, 3), 0, (0.2, 2.5, 0.36)),
+        "coupled_oscillator": check_jacobian(coupled_oscillator, coupled_oscillator_jacobian, rng.uniform(-1, 1, 2 * n), 0, (1, period, 0.03, 0.1, n)),
+        "coupled_oscillator_meanfield": check_jacobian(lambda par, t, *a: coupled_oscillator_meanfield(t, par, *a),
+                                                       lambda par, t, *a: coupled_oscillator_meanfield_jacobian(t, par, *a).toarray(),
+                                                       rng.uniform(-1, 1, 2 * n + 1), 0, (1, period, 0.03, 0.1, n)),
+    }
+
+    for model, error in errors.items():
+        assert error < tol, f"Jacobian of {model} differs from finite differences by {error}"
+
+    return errors
@@ -0,0 +1,161 @@
+import os
+import uuid
+import threading
+import multiprocessing
+from collections import OrderedDict
+
+
+# [Jobs]_________________________________________________________________________________________________________________________________________
+
+class JobTable:
+    """
+    Small table of background jobs for the Dash app, so a long solve or sweep does not block the request thread.
+
+    Every job runs in its own process, at most max_workers at a time (the others wait as "pending"), so cancel() can really kill
+    the work with terminate(). Jobs with the same key are coalesced: as long as one is pending or running, submitting the same key
+    again (for example from another session) only adds an owner to it. Every submit hands out its own owner token, and status and cancel
+    take this token, so a token can give its share back only once and the process is only killed when its last owner cancels.
+    The job function gets a shared float progress, where it writes how far it got
+    (for example the integration time that was reached), and it sends its result through the ResultStore on disk.
+    The table lives in the server process, so the app should run with one server process (and as many threads as it likes).
+    """
+
+    def __init__(self, max_workers : int = None, history : int = 100):
+        """
+        Args:
+            max_workers (int): jobs that run at the same time, None takes all cores
+            history (int): finished jobs that are remembered for status()
+        """
+        self.max_workers = max_workers or os.cpu_count()
+        self.history = history
+        self.jobs = OrderedDict()
+        self.tokens = {}    # owner token -> id of the job
+        self.lock = threading.Lock()
+
+
+    def submit(self, func, *args, key : str = None, total : float = 1, **kwargs):
+        """
+        Adding a job. func(*args, progress = progress, **kwargs) runs in a new process as soon as a worker is free.
+
+        Args:
+            func (callable): module level job function with a progress keyword (multiprocessing.Value of a float)
+            key (str): key of the result (hash_key). A pending or running job with the same key is shared instead of starting a new one
+            total (float): value of progress at the end, for example the last timepoint
+            *args, **kwargs: arguments of func
+
+        Returns:
+            str: owner token for status and cancel
+        """
+        token = uuid.uuid4().hex
+
+        with self.lock:
+            self.update()
+
+            for job_id, job in self.jobs.items():
+                if key is not None and job["key"] == key and job["status"] in ("pending", "running"):
+                    job["owners"].add(token)
+                    job["tokens"].add(token)
+                    self.tokens[token] = job_id
+                    return token
+
+            progress = multiprocessing.Value("d", 0.0, lock = False)
+            process = multiprocessing.Process(target = func, args = args, kwargs = {**kwargs, "progress": progress}, daemon = True)
+            job_id = uuid.uuid4().hex
+
+            self.jobs[job_id] = {"process": process, "progress": progress, "total": float(total), "status": "pending", "key": key,
+                                 "owners": {token}, "tokens": {token}}     # owners still hold a share, tokens are all that were handed out
+            self.tokens[token] = job_id
+            self.update()
+
+        return token
+
+
+    def update(self):
+        """finishing the jobs whose process ended, starting pending ones and forgetting old ones (call it under the lock)"""
+        for job in self.jobs.values():
+            if job["status"] == "running" and not job["process"].is_alive():
+                job["status"] = "done" if job["process"].exitcode == 0 else "failed"
+
+        running = sum(job["status"] == "running" for job in self.jobs.values())
+
+        for job in self.jobs.values():
+            if running >= self.max_workers:
+                break
+
+            if job["status"] == "pending":
+                job["process"].start()
+                job["status"] = "running"
+                running += 1
+
+        finished = [i for i, job in self.jobs.items() if job["status"] in ("done", "failed", "cancelled")]
+
+        for job_id in finished[: max(len(finished) - self.history, 0)]:
+            for token in self.jobs.pop(job_id)["tokens"]:
+                self.tokens.pop(token, None)
+
+
+    def status(self, token : str):
+        """
+        Args:
+            token (str): owner token from submit
+
+        Returns:
+            dict: status ("pending", "running", "done", "failed", "cancelled" or "unknown"), progress between 0 and 1
+                  and value, the progress as the job wrote it (for example the numbers of points that are ready)
+        """
+        with self.lock:
+            self.update()
+            job = self.jobs.get(self.tokens.get(token))
+
+            if job is None:
+                return {"status": "unknown", "progress": 0.0, "value": 0.0}
+
+            progress = 1.0 if job["status"] == "done" else min(max(job["progress"].value / job["total"], 0.0), 1.0) if job["total"] else 0.0
+
+            return {"status": job["status"], "progress": progress, "value": job["progress"].value}
+
+
+    def cancel(self, token : str):
+        """
+        Giving the share of a token back. The job gets killed (or taken out of the queue if it has not started yet)
+        as soon as no owner is left, so a coalesced job keeps running until its last owner cancels.
+
+        Args:
+            token (str): owner token from submit. Unknown, already cancelled or finished tokens are ignored
+
+        Returns:
+            bool: True if the job was killed
+        """
+        with self.lock:
+            self.update()
+            job_id = self.tokens.get(token)
+            job = self.jobs.get(job_id)
+
+            if job is None or token not in job["owners"] or job["status"] not in ("pending", "running"):
+                return False
+
+            job["owners"].discard(token)    # the token stays known for status(), but it can not cancel a second time
+
+            if job["owners"]:
+                return False
+
+            if job["status"] == "running":
+                job["process"].terminate()
+                job["process"].join(timeout = 5)
+
+            job["status"] = "cancelled"
+            self.update()
+
+            return True
+
+
+    def shutdown(self):
+        """killing all jobs, no matter how many owners they have"""
+        with self.lock:
+            for job in self.jobs.values():
+                if job["status"] == "running":
+                    job["process"].terminate()
+                    job["process"].join(timeout = 5)
+
+                if job["status"] in ("pending", "running"):
+                    job["status"] = "cancelled"
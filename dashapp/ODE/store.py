@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import numpy as np
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:     # Windows, the store still works but without locks between processes
+    fcntl = None
+
+
+# [Lock]_________________________________________________________________________________________________________________________________________
+
+@contextmanager
+def locked(path : str):
+    """
+    Exclusive file lock (fcntl.flock) around a block, so several processes (Dash workers, scripts) can use the same store.
+    The lock file can get removed (ResultStore.remove) while another process waits for it, so after getting the lock
+    it is checked that the file at path is still the one that is locked, otherwise it is tried again with the new file.
+
+    Args:
+        path (str): lock file, it gets created if it is missing
+    """
+    if fcntl is None:
+        yield
+        return
+
+    while True:
+        with open(path, "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(path) and os.path.samestat(os.fstat(file.fileno()), os.stat(path)):
+                    yield
+                    return
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+# [Store]________________________________________________________________________________________________________________________________________
+
+class ResultStore:
+    """
+    Persistent, content addressed store for trajectories and sweep reductions.
+
+    Every result is saved as <key>.npy with a <key>.json sidecar (shape, dtype, size, model, time of the last use).
+    The key is the hash_key of everything that defines the run (model, parameters, timespan, solver settings), so the same integration
+    is found again by every process and after a restart. Numeric results are loaded memory mapped (read only), so a big trajectory
+    is not read into RAM until it is used. Results that are no plain arrays (tuples of different shapes...) are pickled into the .npy.
+
+    Writing goes to a temporary file that is renamed at the end, so nobody ever reads half a file. A lock per key makes sure that
+    two processes that need the same result integrate it only once, and the eviction of the least recently used results
+    (as soon as the store is bigger than max_bytes) runs under a lock of the whole store.
+    """
+
+    def __init__(self, root : str = None, max_bytes : int = 10 * 1024**3):
+        """
+        Args:
+            root (str): folder of the store. None takes $ODE_STORE or ~/.cache/ode-training
+            max_bytes (int): size cap of all stored results in bytes
+        """
+        self.root = root or os.environ.get("ODE_STORE") or os.path.join(os.path.expanduser("~"), ".cache", "ode-training")
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok = True)
+
+
+    def path(self, key : str, suffix : str = ".npy"):
+        return os.path.join(self.root, key + suffix)
+
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key)) and os.path.exists(self.path(key, ".json"))
+
+
+    def load(self, key : str):
+        """
+        Args:
+            key (str): key from hash_key
+
+        Returns:
+            the stored result (memory mapped array or the unpickled object) or None if it is missing
+        """
+        try:
+            with open(self.path(key, ".json")) as file:
+                meta = json.load(file)
+
+            if meta["pickled"]:
+                value = np.load(self.path(key), allow_pickle = True)[()]
+            else:
+                value = np.load(self.path(key), mmap_mode = "r")
+
+            os.utime(self.path(key, ".json"))     # last use, for the eviction
+
+        except (FileNotFoundError, ValueError, KeyError):   # missing, or evicted by another process in the meantime
+            return None
+
+        return value
+
+
+    def save(self, key : str, value, **meta):
+        """
+        Writing one result and evicting old ones if the store got too big.
+
+        Args:
+            key (str): key from hash_key
+            value: array, or any other picklable result
+            **meta: extra information for the sidecar (model name, parameters...)
+
+        Returns:
+            the result as it will be loaded later (memory mapped for arrays)
+        """
+        try:
+            array = np.asarray(value) if isinstance(value, (np.ndarray, list, tuple)) else None
+            pickled = array is None or array.dtype == object
+        except ValueError:      # ragged lists
+            pickled = True
+
+        if pickled:
+            array = np.empty((), dtype = object)
+            array[()] = value
+
+        temporary = self.path(key, f".{os.getpid()}.tmp")
+
+        with open(temporary, "wb") as file:
+            np.save(file, array, allow_pickle = pickled)
+        os.replace(temporary, self.path(key))
+
+        sidecar = {"key": key, "pickled": pickled, "bytes": os.path.getsize(self.path(key)), "created": time.time(), **meta}
+        if not pickled:
+            sidecar.update(shape = list(array.shape), dtype = str(array.dtype))
+
+        with open(temporary, "w") as file:
+            json.dump(sidecar, file, default = str)
+        os.replace(temporary, self.path(key, ".json"))
+
+        self.evict()
+        stored = None if pickled else self.load(key)
+
+        return stored if stored is not None else value     # a result bigger than max_bytes is evicted right away
+
+
+    def get_or_solve(self, key : str, solve, **meta):
+        """
+        Returning the stored result of key. Only if it is missing, solve() gets called and its result is saved.
+        While one process solves, other processes that ask for the same key wait for it instead of integrating it again.
+
+        Args:
+            key (str): key from hash_key
+            solve (callable): function without arguments that does the integration
+            **meta: extra information for the sidecar
+
+        Returns:
+            the result
+        """
+        value = self.load(key)
+
+        if value is not None:
+            return value
+
+        with locked(self.path(key, ".lock")):
+            value = self.load(key)      # another process might have finished it while we were waiting
+
+            if value is None:
+                value = self.save(key, solve(), **meta)
+
+        return value
+
+
+    def entries(self):
+        """
+        Returns:
+            list: (last use, bytes, key) of every stored result
+        """
+        entries = []
+
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+
+            try:
+                stat = os.stat(os.path.join(self.root, name))
+                key = name[: - len(".json")]
+                entries.append((stat.st_mtime, os.path.getsize(self.path(key)), key))
+            except FileNotFoundError:
+                continue
+
+        return entries
+
+
+    @property
+    def size(self):
+        return sum(i[1] for i in self.entries())
+
+
+    def remove(self, key : str):
+        for suffix in (".json", ".npy"):
+            try:
+                os.remove(self.path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+        if fcntl is None:
+            return
+
+        # the lock file only goes away if nobody holds it, a process in get_or_solve keeps it (and its solve) exclusive
+        try:
+            with open(self.path(key, ".lock"), "a") as file:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                try:
+                    os.remove(self.path(key, ".lock"))
+                finally:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+        except (BlockingIOError, FileNotFoundError):
+            pass
+
+
+    def evict(self):
+        """removing the least recently used results until the store is smaller than max_bytes"""
+        with locked(os.path.join(self.root, ".lock")):
+            entries = sorted(self.entries())
+            size = sum(i[1] for i in entries)
+
+            while entries and size > self.max_bytes:
+                last_use, nbytes, key = entries.pop(0)
+                self.remove(key)
+                size -= nbytes
+
+
+    def clear(self):
+        with locked(os.path.join(self.root, ".lock")):
+            for key in [i[2] for i in self.entries()]:
+                self.remove(key)
@@ -0,0 +1,311 @@
+import os
+import json
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from .cache import hash_key
+
+
+# [Worker]_______________________________________________________________________________________________________________________________________
+
+def run_chunk(func, chunk):
+    """runs one chunk of parameter values inside a worker process.
+
+    Args:
+        func (callable): module level function that solves one parameter value and returns a small reduction
+        chunk (list): parameter values of this chunk
+
+    Returns:
+        list: the reductions of the chunk in the same order
+    """
+    return [func(value) for value in chunk]
+
+
+def run_tile(func, x_values, y_values):
+    """solves one tile of a two parameter sweep inside a worker process.
+
+    Args:
+        func (callable): module level function func(x, y) that returns the reduction of one grid point
+        x_values (list): x values of the tile
+        y_values (list): y values of the tile
+
+    Returns:
+        Array: (len(y_values), len(x_values), *reduction shape) block of the tile
+    """
+    return np.array([[func(x, y) for x in x_values] for y in y_values], dtype = float)
+
+
+def relative_change(a, b):
+    """
+    Default distance of two neighbouring reductions for the adaptive sweeps: the largest relative change of all entries.
+    If a value turns into nan or back (for example the period when the oscillation dies), the classification changed
+    and the distance is infinite.
+
+    Args:
+        a (array): reduction of the left value
+        b (array): reduction of the right value
+
+    Returns:
+        float: distance
+    """
+    a = np.asarray(a, dtype = float)
+    b = np.asarray(b, dtype = float)
+
+    if a.shape != b.shape or np.any(np.isnan(a) != np.isnan(b)):
+        return np.inf
+
+    valid = ~ np.isnan(a)
+
+    if not valid.any():
+        return 0
+
+    scale = np.maximum((np.abs(a[valid]) + np.abs(b[valid])) / 2, 1e-12)
+
+    return np.max(np.abs(a[valid] - b[valid]) / scale)
+
+
+# [Tiles]________________________________________________________________________________________________________________________________________
+
+class TiledArray:
+    """
+    Result of a two parameter sweep on disk. It is one .npy file (memory mapped) of shape (len(y), len(x), *fields),
+    which gets written tile by tile, and a small .npy mask of the finished tiles next to it.
+    A tile is only marked as finished after its values are flushed, so a sweep that got killed can resume where it stopped.
+    meta.json holds the key of the sweep, so a folder is never resumed with other parameters.
+    """
+
+    def __init__(self, path : str, shape : tuple, tile : int, key : str):
+        """
+        Args:
+            path (str): folder of the sweep
+            shape (tuple): (len(y), len(x), *fields)
+            tile (int): edge length of the square tiles
+            key (str): hash_key of everything that defines the sweep
+
+        Raises:
+            ValueError: if the folder belongs to another sweep
+        """
+        os.makedirs(path, exist_ok = True)
+        self.path = path
+        self.tile = tile
+        self.grid = (int(np.ceil(shape[0] / tile)), int(np.ceil(shape[1] / tile)))
+
+        meta_path = os.path.join(path, "meta.json")
+        meta = {"key": key, "shape": list(shape), "tile": tile}
+        resume = os.path.exists(meta_path)
+
+        if resume:
+            with open(meta_path) as file:
+                if json.load(file) != meta:
+                    raise ValueError(f"{path} holds another sweep, choose a new folder")
+
+        values_path = os.path.join(path, "values.npy")
+        done_path = os.path.join(path, "done.npy")
+
+        if resume and os.path.exists(values_path) and os.path.exists(done_path):
+            self.values = np.lib.format.open_memmap(values_path, mode = "r+")
+            self.done = np.lib.format.open_memmap(done_path, mode = "r+")
+        else:
+            self.values = np.lib.format.open_memmap(values_path, mode = "w+", dtype = float, shape = tuple(shape))
+            self.values[:] = np.nan
+            self.values.flush()
+            self.done = np.lib.format.open_memmap(done_path, mode = "w+", dtype = bool, shape = self.grid)
+            self.done.flush()
+
+            with open(meta_path, "w") as file:
+                json.dump(meta, file)
+
+
+    def slices(self, i : int, j : int):
+        """rows and columns of tile (i, j)"""
+        return slice(i * self.tile, (i + 1) * self.tile), slice(j * self.tile, (j + 1) * self.tile)
+
+
+    def missing(self):
+        """tiles that are not finished yet"""
+        return [(i, j) for i in range(self.grid[0]) for j in range(self.grid[1]) if not self.done[i, j]]
+
+
+    def write(self, i : int, j : int, block):
+        """storing one finished tile"""
+        rows, columns = self.slices(i, j)
+        self.values[rows, columns] = block
+        self.values.flush()
+        self.done[i, j] = True
+        self.done.flush()
+
+
+# [Sweep]________________________________________________________________________________________________________________________________________
+
+class SweepExecutor:
+    """
+    Running parameter sweeps on all cores with a ProcessPoolExecutor.
+
+    The parameter values get cut into chunks and every chunk is solved in a worker process.
+    The workers only send back the reduction of every run (extrema, periods...), never the full trajectories,
+    so the pickling between the processes stays cheap and the parent does not need to hold M solutions in memory.
+    """
+
+    def __init__(self, max_workers : int = None, chunksize : int = None):
+        """
+        Args:
+            max_workers (int): numbers of worker processes. None takes every core of the machine, 1 runs the sweep serial without a pool
+            chunksize (int): parameter values per task. None chooses about four chunks per worker
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+
+
+    def chunks(self, values):
+        """cutting the parameter values into chunks.
+
+        Args:
+            values (list or array): parameter values of the sweep
+
+        Returns:
+            list: list of chunks
+        """
+        values = list(values)
+        chunksize = self.chunksize or max(1, int(np.ceil(len(values) / (4 * self.max_workers))))
+
+        return [values[i : i + chunksize] for i in range(0, len(values), chunksize)]
+
+
+    def imap(self, func, values, **kwargs):
+        """
+        Solving func for every parameter value and streaming the results back in the order of values.
+        Only a couple of chunks per worker are in flight, so results get yielded while the rest of the sweep is still running.
+
+        Args:
+            func (callable): module level function func(value, **kwargs), it has to be picklable
+            values (list or array): parameter values of the sweep
+            **kwargs: fixed arguments for func (initial values, timespan, ...)
+
+        Yields:
+            the reduction of func for every value
+        """
+        func = partial(func, **kwargs)
+        chunks = self.chunks(values)
+
+        if self.max_workers == 1:
+            for chunk in chunks:
+                yield from run_chunk(func, chunk)
+            return
+
+        with ProcessPoolExecutor(max_workers = self.max_workers) as pool:
+            pending = deque()
+
+            for chunk in chunks:
+                pending.append(pool.submit(run_chunk, func, chunk))
+
+                if len(pending) >= 2 * self.max_workers:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+
+    def map(self, func, values, **kwargs):
+        """same as imap, but collecting all results in a list.
+
+        Returns:
+            list: the reduction of func for every value
+        """
+        return list(self.imap(func, values, **kwargs))
+
+
+    def grid(self, func, x_values, y_values, path : str, fields : tuple = (), tile : int = 16, **kwargs):
+        """
+        Two parameter sweep. The (y, x) grid is cut into square tiles, every tile is solved in a worker process
+        and written to a TiledArray on disk as soon as it is finished, in whatever order the tiles complete.
+        Calling it again with the same arguments and folder skips the finished tiles (resume).
+
+        Args:
+            func (callable): module level function func(x, y, **kwargs) that returns the reduction of one grid point, it has to be picklable
+            x_values (list or array): values of the first parameter (columns)
+            y_values (list or array): values of the second parameter (rows)
+            path (str): folder of the results
+            fields (tuple): shape of the reduction of one grid point
+            tile (int): edge length of the tiles
+            **kwargs: fixed arguments for func
+
+        Returns:
+            Array: memory mapped (len(y_values), len(x_values), *fields) results, nan where a tile is missing
+        """
+        x_values = np.asarray(x_values, dtype = float)
+        y_values = np.asarray(y_values, dtype = float)
+
+        key = hash_key(func.__name__, x_values, y_values, *[part for name in sorted(kwargs) for part in (name, kwargs[name])])
+        array = TiledArray(path, (len(y_values), len(x_values)) + tuple(fields), tile, key)
+
+        func = partial(func, **kwargs)
+
+        def task(i, j):
+            rows, columns = array.slices(i, j)
+            return func, x_values[columns], y_values[rows]
+
+        if self.max_workers == 1:
+            for i, j in array.missing():
+                array.write(i, j, run_tile(*task(i, j)))
+
+            return array.values
+
+        with ProcessPoolExecutor(max_workers = self.max_workers) as pool:
+            missing = deque(array.missing())
+            pending = {}
+
+            while missing or pending:
+                while missing and len(pending) < 2 * self.max_workers:
+                    i, j = missing.popleft()
+                    pending[pool.submit(run_tile, *task(i, j))] = (i, j)
+
+                finished = wait(pending, return_when = FIRST_COMPLETED)[0]
+
+                for future in finished:
+                    array.write(*pending.pop(future), future.result())
+
+        return array.values
+
+
+    def refine(self, func, start : float, stop : float, budget : int, initial : int = 17, threshold : float = 0.05,
+               min_step : float = None, distance = relative_change, **kwargs):
+        """
+        Adaptive sweep. It starts with a coarse grid and then keeps halving the intervals where the reductions of both ends
+        differ by more than threshold, the biggest differences first. Every round of new values is solved in parallel with map.
+        Flat parts of a bifurcation diagram stay coarse, and the solves go where the diagram changes quickly (Hopf points, period doublings).
+
+        Args:
+            func (callable): module level function func(value, **kwargs), it has to be picklable
+            start (float): First value of the interval
+            stop (float): Last value of the interval (it is included)
+            budget (int): total numbers of solves
+            initial (int): numbers of values of the coarse grid
+            threshold (float): intervals with a larger distance get refined
+            min_step (float): intervals that are shorter than this are not refined anymore. None takes (stop - start) / 1000
+            distance (callable): distance(a, b) of two reductions, relative_change by default
+            **kwargs: fixed arguments for func
+
+        Returns:
+            Array, List: the sorted values and their reductions
+        """
+        min_step = min_step or (stop - start) / 1000
+        values = list(np.linspace(start, stop, min(initial, budget)))
+        results = self.map(func, values, **kwargs)
+
+        while len(values) < budget:
+            scores = [distance(results[i], results[i + 1]) for i in range(len(values) - 1)]
+            intervals = [i for i in np.argsort(scores)[::-1] if scores[i] > threshold and values[i + 1] - values[i] > 2 * min_step]
+
+            if not intervals:
+                break
+
+            intervals = intervals[: budget - len(values)]
+            middle = [(values[i] + values[i + 1]) / 2 for i in intervals]
+            solved = self.map(func, middle, **kwargs)
+
+            order = np.argsort(values + middle)
+            values = [(values + middle)[i] for i in order]
+            results = [(results + solved)[i] for i in order]
+
+        return np.array(values), results
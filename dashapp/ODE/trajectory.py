@@ -0,0 +1,76 @@
+
+# [Trajectory]___________________________________________________________________________________________________________________________________
+
+class Trajectory:
+    """
+    Lazy solution of one integration.
+
+    The solver only runs the first time the solution is needed, afterwards every access uses the same array.
+    The components (for example u, v, w) and the tail windows are views into this one array, so nothing gets copied.
+    """
+
+    def __init__(self, solve, t, names):
+        """
+        Args:
+            solve (callable): function without arguments that returns the (len(t), len(names)) solution
+            t (array): timespan
+            names (list): names of the components in the order of the columns, for example ["u", "v", "w"]
+        """
+        self.solve = solve
+        self.t = t
+        self.names = list(names)
+        self.solution = None
+
+
+    @property
+    def sol(self):
+        """the whole solution, it gets integrated at the first access"""
+        if self.solution is None:
+            self.solution = self.solve()
+
+        return self.solution
+
+
+    @property
+    def solved(self):
+        return self.solution is not None
+
+
+    def __len__(self):
+        return len(self.t)
+
+
+    def __getattr__(self, name):
+        names = self.__dict__.get("names", [])
+
+        if name in names:
+            return self.component(names.index(name))
+
+        raise AttributeError(name)
+
+
+    def component(self, index : int):
+        """
+        Args:
+            index (int): column of the component
+
+        Returns:
+            Array: 1D view of one component
+        """
+        return self.sol[:, index]
+
+
+    def tail(self, keep : int):
+        """
+        Only the last couple of timepoints, for example to remove the transient part.
+
+        Args:
+            keep (int): last couple of timepoints that we want to see
+
+        Returns:
+            Trajectory: solved trajectory whose solution and timespan are slices of this one
+        """
+        window = Trajectory(None, self.t[-keep:], self.names)
+        window.solution = self.sol[-keep:]
+
+        return window
@@ -6,10 +6,7 @@ import dash
 app = Dash(__name__, use_pages = True, suppress_callback_exceptions= True, pages_folder= "pages", external_stylesheets=[dbc.themes.JOURNAL])
 
 app.layout = html.Div([
-    dcc.Store(id = "duffing_solution", storage_type = "session"),  # in case i want to store something temporarily over the web
-    dcc.Store(id = "duffing_u_solution", storage_type = "session"),
-    dcc.Store(id = "duffing_v_solution", storage_type = "session"),
-    dcc.Store(id = "duffing_w_solution", storage_type = "session"),
+    dcc.Store(id = "duffing_solution", storage_type = "session"),  # only the key and inputs of the solution, the arrays stay on the server (pages/duffing.py)
     dash.page_container
 ])
 
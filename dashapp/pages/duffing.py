@@ -4,7 +4,11 @@ import dash
 from dash.dependencies import Input, Output, State
 from PIL import Image
 import numpy as np
-from ODE import Duffing
+from ODE.duffing_poincare import duffing_job, duffing_blocks
+from ODE.jobs import JobTable
+from ODE.store import ResultStore
+from ODE.cache import SolutionCache, hash_key
+from ODE.decimation import pyramid, pyramid_window, pyramid_box
 from pathlib import Path
 import plotly.graph_objects as go
 from scipy.integrate import odeint
@@ -32,6 +36,88 @@ def duffing(par, t, gamma, alpha, omega):
 
     return [dx, dy, dz]
 
+# [Solutions]____________________________________________________________________________________________________________________________________________________________
+
+store = ResultStore()   # shared by all Dash workers, a solution that was calculated once is loaded from disk
+solutions = SolutionCache(max_bytes = 1024**3, max_entries = 16)   # server side memory, the dcc.Store in app.py only holds the keys
+jobs = JobTable(max_workers = 2)    # the solves run in background processes, the request threads stay free
+
+
+def duffing_spec(t_end, t_step, keep, u, v, w, gamma, alpha, omega):
+    """
+    Everything that defines one solution of the page. This small dictionary is what goes into the dcc.Store "duffing_solution",
+    the solution itself never leaves the server.
+
+    Returns:
+        dict: key of the solution and the inputs to integrate it again
+    """
+    spec = {"par" : [u, v, w], "t_end" : t_end, "t_step" : t_step, "keep" : int(keep), "gamma" : gamma, "alpha" : alpha, "omega" : omega}
+    spec["key"] = hash_key("duffing_page", spec["par"], t_end, t_step, gamma, alpha, omega)
+
+    return spec
+
+
+def duffing_solution(spec):
+    """
+    Solution of a spec out of the server side memory. If it is missing (other worker, restart, evicted) the store on disk
+    is asked (the background jobs save their solutions there), and only if that misses too, it gets integrated again
+    with the same block integrator as the jobs (duffing_blocks).
+
+    Args:
+        spec (dict): content of the dcc.Store "duffing_solution" (see duffing_spec)
+
+    Returns:
+        Array: (len(t), 3) read only solution for u, v, w
+    """
+    def solve():
+        t = np.arange(0, spec["t_end"], spec["t_step"])
+        return duffing_blocks(spec["par"], t, spec["gamma"], spec["alpha"], spec["omega"])
+
+    return solutions.get_or_solve(spec["key"], lambda: store.get_or_solve(spec["key"], solve, model = "duffing"))
+
+
+max_points = 4000   # per trace, more points stall the browser
+
+
+def duffing_window(spec):
+    """
+    Kept window of a solution and its min/max decimation pyramid over u and v (built once per solution, kept in the server side memory).
+
+    Args:
+        spec (dict): content of the dcc.Store "duffing_solution"
+
+    Returns:
+        tuple: ((keep, 3) window, levels of the pyramid)
+    """
+    window = duffing_solution(spec)[- spec["keep"]:]
+    levels = solutions.get_or_solve(hash_key(spec["key"], "pyramid", spec["keep"]), lambda: pyramid(window[:, :2]))   # per window, keep can change
+
+    return window, levels
+
+
+def relayout_range(relayout, axis : str):
+    """
+    Visible range of an axis after zooming.
+
+    Args:
+        relayout (dict): relayoutData of the dcc.Graph
+        axis (str): "xaxis" or "yaxis"
+
+    Returns:
+        tuple: (lower, upper) or None if the axis shows everything
+    """
+    if not relayout or relayout.get(axis + ".autorange"):
+        return None
+
+    if axis + ".range[0]" in relayout:
+        return relayout[axis + ".range[0]"], relayout[axis + ".range[1]"]
+
+    if axis + ".range" in relayout:
+        return tuple(relayout[axis + ".range"])
+
+    return None
+
+
 # [Design]____________________________________________________________________________________________________________________________________________________________
 
 logo = Path(str(Path.cwd()) + "/dashapp/templates/logo.png")
@@ -98,6 +184,7 @@ layout = dbc.Container(fluid = True, children = [
                                     placeholder = "time end",
                                     type = "number",
                                     step = 0.1,
+                                    min = 0.1,
                                     id = "last_timepoint",
                                 ), width= {"size" : 2}
                             ),
@@ -115,6 +202,7 @@ layout = dbc.Container(fluid = True, children = [
                                     placeholder = "Steps",
                                     type = "number",
                                     step = 0.01,
+                                    min = 0.01,
                                     id = "time_steps",
                                 ), width= {"size" : 2}
                             ),
@@ -134,6 +222,7 @@ layout = dbc.Container(fluid = True, children = [
                                     placeholder = "observal time interval",
                                     type = "number",
                                     step = 0.1,
+                                    min = 1,
                                     id = "observ_timeinterval",
                                 ), width= {"size" : 2}
                             ),
@@ -287,10 +376,37 @@ layout = dbc.Container(fluid = True, children = [
                                 outline= True,
                                 n_clicks = 0
                                 ),width= {"size" : 1}
+                            ),
+
+                            dbc.Col(
+                                dbc.Button(
+                                "Cancel",
+                                id = "cancel",
+                                color= "danger",
+                                outline= True,
+                                n_clicks = 0
+                                ),width= {"size" : 1}
                             )
                         ], justify= "center"
                         
                         
+                    ),
+
+                    html.Div(style = {"padding" : 10}),
+
+                    dbc.Row(
+                        children = [
+                            dbc.Col(
+                                dbc.Progress(
+                                    id = "duffing_progress",
+                                    value = 0,
+                                    striped = True,
+                                    animated = True
+                                ), width= {"size" : 6}
+                            ),
+                            dcc.Interval(id = "job_poll", interval = 500, disabled = True),    # asking the job table how far the solve is
+                            dcc.Store(id = "duffing_job"),
+                        ], justify= "center"
                     ),
 
                         ], justify= "center"
@@ -421,59 +537,113 @@ layout = dbc.Container(fluid = True, children = [
 # [Callbacks]_________________________________________________________________________________________________________________________________________________________
 
 @callback(
-   [ 
-       Output("duffing_solution", "data"),
-       Output("duffing_u_solution", "data"),
-       Output("duffing_v_solution", "data"),
-       Output("duffing_w_solution", "data"),
-       
+    [
+        Output("duffing_job", "data"),
+        Output("job_poll", "disabled"),
     ],
     [
-        Input("calculate", "n_clicks"),
-        Input("last_timepoint", "value"),
-        Input("time_steps", "value"),
+        Input("calculate", "n_clicks"),     # only the Start button solves, typing in the fields does not
+        State("last_timepoint", "value"),
+        State("time_steps", "value"),
         State("observ_timeinterval", "value"),
-        Input("u_value", "value"),
-        Input("v_value", "value"),
-        Input("w_value", "value"),
-        Input("gamma", "value"),
-        Input("alpha", "value"),
-        Input("omega", "value")
+        State("u_value", "value"),
+        State("v_value", "value"),
+        State("w_value", "value"),
+        State("gamma", "value"),
+        State("alpha", "value"),
+        State("omega", "value"),
+        State("duffing_job", "data"),
     ],
     prevent_initial_call = True
 )
-def solv_duffing(click, t_end, t_step, keep, u, v, w, gamma, alpha, omega):
-    if not click:
-        return None
-    
-    
+def solv_duffing(click, t_end, t_step, keep, u, v, w, gamma, alpha, omega, job):
+    if not click or None in (t_end, t_step, keep, u, v, w, gamma, alpha, omega) or t_end <= 0 or t_step <= 0 or int(keep) < 1:
+        return dash.no_update, dash.no_update
 
-    par = [u, v, w]
+    spec = duffing_spec(t_end, t_step, keep, u, v, w, gamma, alpha, omega)
     t = np.arange(0, t_end, t_step)
-    
-    duff = Duffing(par, t, gamma, alpha, omega)
 
-    sol = duff.duffing_solver()
+    # the same solve that is already running (from any session) is shared instead of started again
+    token = jobs.submit(duffing_job, spec["key"], spec["par"], t, gamma, alpha, omega, store, key = spec["key"], total = t[-1])
 
-    x_sol = duff.x_solv(keep)
-    y_sol = duff.y_solv(keep)
-    z_sol = duff.z_solv(keep)
-    
-    return [sol, x_sol, y_sol, z_sol]
+    if job is not None:
+        jobs.cancel(job["token"])   # the previous solve of this session is stale (if it is the same one, this only gives back its share)
+
+    return {"token" : token, "spec" : spec}, False
+
+
+@callback(
+    [
+        Output("duffing_progress", "value"),
+        Output("duffing_progress", "label"),
+        Output("duffing_solution", "data"),
+        Output("job_poll", "disabled", allow_duplicate = True),
+    ],
+    Input("job_poll", "n_intervals"),
+    State("duffing_job", "data"),
+    prevent_initial_call = True
+)
+def poll_duffing(n_intervals, job):
+    if job is None:
+        return 0, "", dash.no_update, True
+
+    status = jobs.status(job["token"])
+    percent = 100 * status["progress"]
+
+    if status["status"] == "done":
+        return 100, "done", job["spec"], True
+
+    if status["status"] in ("pending", "running"):
+        return percent, f"{percent:.0f} %", dash.no_update, False
+
+    return percent, status["status"], dash.no_update, True
+
+
+@callback(
+    [
+        Output("duffing_progress", "label", allow_duplicate = True),
+        Output("job_poll", "disabled", allow_duplicate = True),
+        Output("duffing_job", "data", allow_duplicate = True),
+    ],
+    Input("cancel", "n_clicks"),
+    State("duffing_job", "data"),
+    prevent_initial_call = True
+)
+def cancel_duffing(click, job):
+    if not click or job is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    jobs.cancel(job["token"])
+
+    return "cancelled", True, None     # the token is given back, nobody may cancel with it again
 
 
 @callback(
         Output("timeseries", "figure"),
         [
             Input("timeseries_ddm", "value"),
-            Input("duffing_u_solution", "data"),
-            Input("duffing_v_solution", "data"),
-            Input("time_steps", "value"),
-            State("observ_timeinterval", "value"),
+            Input("duffing_solution", "data"),
+            Input("timeseries", "relayoutData"),
         ]
 )
-def duffing_timeseries(dropdown, u_sol, v_sol, t_step, t_last):
-    t = np.arange(0, t_last, t_step)
+def duffing_timeseries(dropdown, spec, relayout):
+    if spec is None:
+        return go.Figure()
+
+    window, levels = duffing_window(spec)
+    t_step = spec["t_step"]
+
+    # zooming refetches only the visible part out of a finer level of the pyramid
+    visible = relayout_range(relayout, "xaxis") if dash.ctx.triggered_id == "timeseries" else None
+
+    if visible is None:
+        index = pyramid_window(levels, 0, len(window), max_points)
+    else:
+        index = pyramid_window(levels, int(np.floor(visible[0] / t_step)), int(np.ceil(visible[1] / t_step)) + 1, max_points)
+
+    u_sol = window[index, 0]
+    v_sol = window[index, 1]
+    t = index * t_step
     
     if dropdown == "u":
     
@@ -487,6 +657,7 @@ def duffing_timeseries(dropdown, u_sol, v_sol, t_step, t_last):
                 mode = "lines"
             )
         )
+        fig.update_layout(uirevision = spec["key"])     # keeps the zoom of the user when the finer data comes in
 
         return fig
     
@@ -501,6 +672,7 @@ def duffing_timeseries(dropdown, u_sol, v_sol, t_step, t_last):
                 mode = "lines"
             )
         )
+        fig.update_layout(uirevision = spec["key"])
 
         return fig
 
@@ -508,11 +680,23 @@ def duffing_timeseries(dropdown, u_sol, v_sol, t_step, t_last):
 
 @callback(
     Output("phaseportraits", "figure"),
-    [Input("duffing_u_solution", "data"),
-    Input("duffing_v_solution", "data")],
+    [Input("duffing_solution", "data"),
+    Input("phaseportraits", "relayoutData")],
     prevent_initial_call = True
 )
-def duffing_phaseportraits(u_sol, v_sol):
+def duffing_phaseportraits(spec, relayout):
+    if spec is None:
+        return go.Figure()
+
+    window, levels = duffing_window(spec)
+    zoomed = dash.ctx.triggered_id == "phaseportraits"
+    u_range = (relayout_range(relayout, "xaxis") if zoomed else None) or (-np.inf, np.inf)
+    v_range = (relayout_range(relayout, "yaxis") if zoomed else None) or (-np.inf, np.inf)
+
+    index = pyramid_box(levels, window[:, :2], [u_range[0], v_range[0]], [u_range[1], v_range[1]], max_points)
+    u_sol = np.where(index < 0, np.nan, window[index, 0])    # nan breaks the line where the trajectory leaves the visible box
+    v_sol = np.where(index < 0, np.nan, window[index, 1])
+
     fig = go.Figure()
     fig.update_xaxes(title_text = " u conc in a.u.")
     fig.update_yaxes(title_text = " v conc in a.u.")
@@ -523,6 +707,7 @@ def duffing_phaseportraits(u_sol, v_sol):
             mode = "lines"
         )
     )
+    fig.update_layout(uirevision = spec["key"])
     return fig
 
 
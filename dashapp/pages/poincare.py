@@ -4,7 +4,12 @@ import dash
 from dash.dependencies import Input, Output, State
 from PIL import Image
 import numpy as np
-from ODE import Duffing
+import os
+import tempfile
+from ODE.duffing_poincare import poincare_job
+from ODE.cache import hash_key
+from ODE.store import ResultStore
+from ODE.jobs import JobTable
 from pathlib import Path
 import plotly.graph_objects as go
 
@@ -16,7 +21,7 @@ pil_img = Image.open(logo)
 external_stylesheets = dbc.themes.JOURNAL
 
 dash.register_page(
-    __name__, 
+    __name__,
     path = "/Poincare",
     title = "Poincare",
     name = "Poincare",
@@ -24,6 +29,7 @@ dash.register_page(
 )
 
 # [Page_Layout]_______________________________________________________________________________________________________________________________________________________
+# all ids start with poincare_, the Duffing page has the same inputs and its callbacks would fire on this page otherwise
 
 layout = dbc.Container(fluid = True, children = [
     # [header]
@@ -62,7 +68,7 @@ layout = dbc.Container(fluid = True, children = [
 
                     dbc.Row(
                         dbc.Col(dbc.FormText(
-                                "Time Conditions. First timepoint starts with Zero",
+                                "Section Conditions. One point per driving period 2π/Ω",
                                 color="secondary"
                             ), width= {"size" : 4}),justify= "center"
                     ),
@@ -71,16 +77,16 @@ layout = dbc.Container(fluid = True, children = [
                         children=[
                             dbc.Col(
                                 dbc.Input(
-                                    placeholder = "time end",
+                                    placeholder = "section points",
                                     type = "number",
-                                    step = 0.1,
-                                    id = "last_timepoint",
+                                    step = 1,
+                                    id = "poincare_points",
                                 ), width= {"size" : 2}
                             ),
 
                             dbc.Popover(
-                                children= "enter last Timepoint",
-                                target = "last_timepoint",
+                                children= "numbers of points in the section. For example 100000",
+                                target = "poincare_points",
                                 body= True,
                                 trigger= "hover",
                                 placement= "top"
@@ -88,39 +94,23 @@ layout = dbc.Container(fluid = True, children = [
 
                             dbc.Col(
                                 dbc.Input(
-                                    placeholder = "Steps",
+                                    placeholder = "transient periods",
                                     type = "number",
-                                    step = 0.01,
-                                    id = "time_steps",
-                                ), width= {"size" : 2}
-                            ),
-
-                            dbc.Popover(
-                                children= "the steps between the first and last timepoint.",
-                                target = "time_steps",
-                                body= True,
-                                trigger= "hover",
-                                placement= "top"
-                            ),
-
-                            dbc.Col(
-                                dbc.Input(
-                                    placeholder = "observal time interval",
-                                    type = "number",
-                                    step = 0.1,
-                                    id = "observ_timeinterval",
+                                    step = 1,
+                                    min = 0,
+                                    id = "poincare_transient",
                                 ), width= {"size" : 2}
                             ),
 
                             dbc.Popover(
-                                children= "For example you only want to see the last 1100 timepoints, enter 1100 in the Input",
-                                target = "observ_timeinterval",
+                                children= "driving periods that are skipped before recording (transient part). For example 100",
+                                target = "poincare_transient",
                                 body= True,
                                 trigger= "hover",
                                 placement= "top"
                             ),
                         ], justify= "center"
-                        
+
                     ),
 
                     html.Div(style = {"padding" : 10}),
@@ -140,12 +130,12 @@ layout = dbc.Container(fluid = True, children = [
                                     placeholder = "u value",
                                     type = "number",
                                     step = 0.01,
-                                    id = "u_value",
+                                    id = "poincare_u_value",
                                 ), width= {"size" : 2}
                             ),
                             dbc.Popover(
                                 children= "enter u. For example 2",
-                                target = "u_value",
+                                target = "poincare_u_value",
                                 body= True,
                                 trigger= "hover",
                                 placement= "top"
@@ -155,14 +145,14 @@ layout = dbc.Container(fluid = True, children = [
                                 dbc.Input(
                                     placeholder = "v value",
                                     type = "number",
-                                    id = "v_value",
+                                    id = "poincare_v_value",
                                     step = 0.01,
                                 ), width= {"size" : 2}
                             ),
 
                             dbc.Popover(
                                 children= "enter v. For example 2",
-                                target = "v_value",
+                                target = "poincare_v_value",
                                 body= True,
                                 trigger= "hover",
                                 placement= "top"
@@ -172,7 +162,7 @@ layout = dbc.Container(fluid = True, children = [
                                 dbc.Input(
                                     placeholder = "w value",
                                     type = "number",
-                                    id = "w_value",
+                                    id = "poincare_w_value",
                                     step = 0.01,
                                 ), width= {"size" : 2}
                             ),
@@ -181,7 +171,7 @@ layout = dbc.Container(fluid = True, children = [
 
                     dbc.Popover(
                                 children= "enter w. For example 2",
-                                target = "w_value",
+                                target = "poincare_w_value",
                                 body= True,
                                 trigger= "hover",
                                 placement= "top"
@@ -191,7 +181,7 @@ layout = dbc.Container(fluid = True, children = [
 
                     dbc.Row(
                         dbc.Col(dbc.FormText(
-                                "Initial Value for the constants \u03B3, \u03B1, \u03A9. ",
+                                "Initial Value for the constants γ, α, Ω. ",
                                 color="secondary"
                             ), width= {"size" : 3}),justify= "center"
                     ),
@@ -200,16 +190,16 @@ layout = dbc.Container(fluid = True, children = [
                         children = [
                             dbc.Col(
                                 dbc.Input(
-                                    placeholder = "\u03B3 value",
+                                    placeholder = "γ value",
                                     type = "number",
                                     step = 0.01,
-                                    id = "gamma",
+                                    id = "poincare_gamma",
                                 ), width= {"size" : 2}
                             ),
 
                             dbc.Popover(
-                                children= "enter \u03B3. For example 0.2",
-                                target = "gamma",
+                                children= "enter γ. For example 0.2",
+                                target = "poincare_gamma",
                                 body= True,
                                 trigger= "hover",
                                 placement= "top"
@@ -217,16 +207,16 @@ layout = dbc.Container(fluid = True, children = [
 
                             dbc.Col(
                                 dbc.Input(
-                                    placeholder = "\u03B1 value",
-                                    id = "alpha",
+                                    placeholder = "α value",
+                                    id = "poincare_alpha",
                                     step = 0.01,
                                     type = "number",
                                 ), width= {"size" : 2}
                             ),
 
                             dbc.Popover(
-                                children= "enter \u03B1. For example 2.5",
-                                target = "alpha",
+                                children= "enter α. For example 2.5",
+                                target = "poincare_alpha",
                                 body= True,
                                 trigger= "hover",
                                 placement= "top"
@@ -234,16 +224,16 @@ layout = dbc.Container(fluid = True, children = [
 
                             dbc.Col(
                                 dbc.Input(
-                                    placeholder = "\u03A9 value",
-                                    id = "omega",
+                                    placeholder = "Ω value",
+                                    id = "poincare_omega",
                                     step = 0.01,
                                     type = "number",
                                 ), width= {"size" : 2}
                             ),
 
                             dbc.Popover(
-                                children= "enter \u03A9. For example 0.61",
-                                target = "omega",
+                                children= "enter Ω. For example 0.61",
+                                target = "poincare_omega",
                                 body= True,
                                 trigger= "hover",
                                 placement= "top"
@@ -256,22 +246,49 @@ layout = dbc.Container(fluid = True, children = [
                             dbc.Col(
                                 dbc.Button(
                                 "Start",
-                                id = "calculate",
+                                id = "poincare_calculate",
                                 color= "success",
                                 outline= True,
                                 n_clicks = 0
                                 ),width= {"size" : 1}
+                            ),
+
+                            dbc.Col(
+                                dbc.Button(
+                                "Cancel",
+                                id = "poincare_cancel",
+                                color= "danger",
+                                outline= True,
+                                n_clicks = 0
+                                ),width= {"size" : 1}
                             )
                         ], justify= "center"
-                        
-                        
+
+
+                    ),
+
+                    html.Div(style = {"padding" : 10}),
+
+                    dbc.Row(
+                        children = [
+                            dbc.Col(
+                                dbc.Progress(
+                                    id = "poincare_progress",
+                                    value = 0,
+                                    striped = True,
+                                    animated = True
+                                ), width= {"size" : 6}
+                            ),
+                            dcc.Interval(id = "poincare_poll", interval = 500, disabled = True),   # fetching the new section points
+                            dcc.Store(id = "poincare_job"),
+                        ], justify= "center"
                     ),
 
                         ], justify= "center"
                     )
                 ], title = "I N I T I A L - C O N D I T I O N"),
 
-            ], start_collapsed= False, id = "initial_condition", always_open=True,)
+            ], start_collapsed= False, id = "poincare_initial_condition", always_open=True,)
         ]
     ),
 
@@ -280,48 +297,17 @@ layout = dbc.Container(fluid = True, children = [
                     dbc.AccordionItem([
                         dbc.Row(
                             children = [
-                                dbc.Col(dcc.Dropdown(
-                                    options = ["u", "v"],
-                                    value = "u",
-                                    id = "timeseries_ddm",
-                                    placeholder = "choose your y-values"
-                                ), width = {"size" : 3}),
-                            ], justify= "center"
-                        ),
-
-                        dbc.Row(
-                            children = [
-
-                                
-
                                 dbc.Col(
                                     dcc.Graph(
-                                    id = "timeseries",
+                                    id = "poincare_section",
                                     style = {"width" : "80vh", "height" : "80vh"}
                                     ), width = {"size" : "auto"}
                                 )
                             ], justify = "center"
                         )
 
-                    ], title = "T I M E S E R I E S")
-                ], start_collapsed= True, always_open=True),
-
-    html.Div(style = {"padding" : 40}),
-        dbc.Accordion([
-                    dbc.AccordionItem([
-                        dbc.Row(
-                            children = [
-                                dbc.Col(
-                                    dcc.Graph(
-                                    id = "phaseportraits",
-                                    style = {"width" : "80vh", "height" : "80vh"}
-                                    ), width = {"size" : "auto"}
-                                )
-                            ], justify = "center"
-                        )
-
-                    ], title = "P H A S E P O R T R A I T S")
-                ], start_collapsed= True, always_open=True)
+                    ], title = "P O I N C A R E - S E C T I O N")
+                ], start_collapsed= False, always_open=True)
 
 ])
 
@@ -329,3 +315,150 @@ layout = dbc.Container(fluid = True, children = [
 
 
 # [Callbacks]_________________________________________________________________________________________________________________________________________________________
+
+store = ResultStore()   # the finished sections, shared with the Duffing page and all workers
+jobs = JobTable(max_workers = 2)
+max_batch = 20000   # section points per update of the graph
+
+
+def remove_section_file(path):
+    """removing the streamed file of a section that was cancelled or failed, so it does not stay in the temp folder"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def section_figure(u_sol = (), v_sol = ()):
+    """
+    Scattergl (WebGL) figure of the section, it stays smooth with 10^5+ points. The points get appended with extendData.
+    """
+    fig = go.Figure()
+    fig.update_xaxes(title_text = " u conc in a.u.")
+    fig.update_yaxes(title_text = " v conc in a.u.")
+    fig = fig.add_trace(
+        go.Scattergl(
+            x = u_sol,
+            y = v_sol,
+            mode = "markers",
+            marker = {"size" : 2}
+        )
+    )
+    return fig
+
+
+@callback(
+    [
+        Output("poincare_section", "figure"),
+        Output("poincare_job", "data"),
+        Output("poincare_poll", "disabled"),
+    ],
+    [
+        Input("poincare_calculate", "n_clicks"),
+        State("poincare_points", "value"),
+        State("poincare_transient", "value"),
+        State("poincare_u_value", "value"),
+        State("poincare_v_value", "value"),
+        State("poincare_w_value", "value"),
+        State("poincare_gamma", "value"),
+        State("poincare_alpha", "value"),
+        State("poincare_omega", "value"),
+        State("poincare_job", "data"),
+    ],
+    prevent_initial_call = True
+)
+def solv_poincare(click, n_points, transient_periods, u, v, w, gamma, alpha, omega, job):
+    if not click or None in (n_points, u, v, w, gamma, alpha, omega) or n_points < 1 or (transient_periods or 0) < 0 or omega <= 0:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    par = [u, v, w]
+    n_points = int(n_points)
+    transient_periods = int(transient_periods or 0)
+    key = hash_key("poincare", par, gamma, alpha, omega, n_points, transient_periods)
+    path = os.path.join(tempfile.gettempdir(), f"poincare_{key}.npy")
+
+    section = store.load(key)
+
+    if section is not None:     # computed before, no need to stream it
+        if job is not None and jobs.cancel(job["token"]):
+            remove_section_file(job["path"])
+
+        return section_figure(section[:, 0], section[:, 1]), None, True
+
+    # the same section that is already running (from any session) is shared instead of started again
+    token = jobs.submit(poincare_job, key, par, gamma, alpha, omega, n_points, transient_periods, path, store, key = key, total = n_points)
+
+    if job is not None and jobs.cancel(job["token"]):   # the previous section of this session is stale (if it is the same one, this only gives back its share)
+        remove_section_file(job["path"])
+
+    return section_figure(), {"token" : token, "key" : key, "path" : path, "sent" : 0}, False
+
+
+@callback(
+    [
+        Output("poincare_section", "extendData"),
+        Output("poincare_job", "data", allow_duplicate = True),
+        Output("poincare_progress", "value"),
+        Output("poincare_progress", "label"),
+        Output("poincare_poll", "disabled", allow_duplicate = True),
+    ],
+    Input("poincare_poll", "n_intervals"),
+    State("poincare_job", "data"),
+    prevent_initial_call = True
+)
+def poll_poincare(n_intervals, job):
+    if job is None:
+        return dash.no_update, dash.no_update, 0, "", True
+
+    status = jobs.status(job["token"])
+    percent = 100 * status["progress"]
+
+    if status["status"] not in ("pending", "running", "done"):
+        if status["status"] == "failed":
+            remove_section_file(job["path"])
+
+        return dash.no_update, dash.no_update, percent, status["status"], True
+
+    if status["status"] == "done":
+        section = store.load(job["key"])
+
+        if section is None and os.path.exists(job["path"]):    # evicted right away, the streamed file still has it
+            section = np.load(job["path"], mmap_mode = "r")
+        elif section is not None and os.path.exists(job["path"]):
+            remove_section_file(job["path"])    # the store has the whole section now
+
+        ready = len(section) if section is not None else job["sent"]
+    else:
+        ready = int(status["value"])
+        section = np.load(job["path"], mmap_mode = "r") if ready > job["sent"] else None
+
+    stop = min(ready, job["sent"] + max_batch)
+    finished = status["status"] == "done" and stop == ready
+
+    if stop <= job["sent"]:
+        return dash.no_update, dash.no_update, percent, f"{percent:.0f} %", finished
+
+    points = np.array(section[job["sent"] : stop])
+    new_points = ({"x" : [points[:, 0]], "y" : [points[:, 1]]}, [0])
+
+    return new_points, {**job, "sent" : stop}, percent, "done" if finished else f"{percent:.0f} %", finished
+
+
+@callback(
+    [
+        Output("poincare_progress", "label", allow_duplicate = True),
+        Output("poincare_poll", "disabled", allow_duplicate = True),
+        Output("poincare_job", "data", allow_duplicate = True),
+    ],
+    Input("poincare_cancel", "n_clicks"),
+    State("poincare_job", "data"),
+    prevent_initial_call = True
+)
+def cancel_poincare(click, job):
+    if not click or job is None:
+        return dash.no_update, dash.no_update, dash.no_update
+
+    if jobs.cancel(job["token"]):   # only if the job was killed, another session might still stream the same section
+        remove_section_file(job["path"])
+
+    return "cancelled", True, None     # the token is given back, nobody may cancel with it again
@@ -0,0 +1,32 @@
+import numpy as np
+from dashapp.ODE.goodwin import goodwin, goodwin_jacobian
+from dashapp.ODE.integrators import odeint_until_converged, odeint_window
+
+
+# [Early_Stop]___________________________________________________________________________________________________________________________________
+
+def test_early_stop_near_hopf():
+    """close to the Hopf point (v2 = 0.87) the amplitude decays slowly, the early stop has to wait for it like the full run"""
+    t = np.arange(0, 50000, 0.1)
+    keep = 5000
+    args = ([0.7, 0.87, 0.7, 0.35, 0.7, 0.35], [1, 1, 1, 1], 7)
+
+    window, t_converged = odeint_until_converged(goodwin, [0, 0, 0], t, keep, args = args, Dfun = goodwin_jacobian)
+    full = odeint_window(goodwin, [0, 0, 0], t, keep, args = args, Dfun = goodwin_jacobian)
+
+    assert t_converged < t[-1]
+    np.testing.assert_allclose(window[:, 0].max(), full[:, 0].max(), rtol = 1e-3)
+    np.testing.assert_allclose(window[:, 0].min(), full[:, 0].min(), rtol = 1e-3)
+
+
+def test_early_stop_limit_cycle():
+    """far away from the Hopf point the run still stops after a couple of chunks"""
+    t = np.arange(0, 50000, 0.1)
+    keep = 5000
+    args = ([0.7, 0.7, 0.7, 0.35, 0.7, 0.35], [1, 1, 1, 1], 7)
+
+    window, t_converged = odeint_until_converged(goodwin, [0, 0, 0], t, keep, args = args, Dfun = goodwin_jacobian)
+    full = odeint_window(goodwin, [0, 0, 0], t, keep, args = args, Dfun = goodwin_jacobian)
+
+    assert t_converged <= 2000
+    np.testing.assert_allclose(window[:, 0].max(), full[:, 0].max(), rtol = 1e-3)